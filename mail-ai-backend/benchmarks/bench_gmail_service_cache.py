@@ -0,0 +1,130 @@
+"""
+Benchmark: per-event Gmail client setup overhead before and after caching.
+
+Every case pays for what an event actually needs before its first Gmail call:
+a valid access token and a client to call Gmail with. "Before" refreshes the
+token through google-auth on every event (``creds.refresh`` in a thread, as
+the processors used to) and then builds a client; "after" asks
+CredentialManager for the token and takes the client from GmailServiceCache,
+rebuilding it only when the token changed. The token endpoint is a mocked
+transport on both sides, so no network access is needed and the numbers are
+local cost only (a real refresh adds a Google round trip to every "before"
+event). Both client types are compared like for like, and the auth callbacks'
+``build()`` is compared with ``build_service()``.
+
+Run from mail-ai-backend/:
+    python -m benchmarks.bench_gmail_service_cache
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+import httpx
+from google.auth.transport import Request, Response
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from common.credential_manager import GOOGLE_TOKEN_URI, CredentialManager
+from common.gmail_client import AsyncGmailClient
+from common.gmail_service_cache import GmailServiceCache, build_service, preload_discovery_docs
+
+ITERATIONS = 200
+EMAIL = "bench@example.com"
+REFRESH_TOKEN = "bench-refresh-token"
+TOKEN_RESPONSE = {"access_token": "bench-token", "expires_in": 3600, "token_type": "Bearer"}
+
+
+class _TokenResponse(Response):
+    status = 200
+    headers = {"content-type": "application/json"}
+    data = json.dumps(TOKEN_RESPONSE).encode("utf-8")
+
+
+class _TokenEndpoint(Request):
+    # google-auth transport that answers every token refresh locally
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        return _TokenResponse()
+
+
+def _token_endpoint(request: httpx.Request) -> httpx.Response:
+    # httpx transport for CredentialManager's refresh, same answer as above
+    return httpx.Response(200, json=TOKEN_RESPONSE)
+
+
+def _credentials() -> Credentials:
+    return Credentials(None, refresh_token=REFRESH_TOKEN, token_uri=GOOGLE_TOKEN_URI,
+                       client_id="bench-client", client_secret="bench-secret")
+
+
+async def _per_event_refresh(make_client):
+    # Old hot path: fresh credentials, a token refresh and a new client on every event
+    creds = _credentials()
+    if not creds.valid: await asyncio.to_thread(creds.refresh, _TokenEndpoint())
+    return make_client(creds)
+
+
+async def _cached(credentials: CredentialManager, cache: GmailServiceCache, make_client):
+    # Same steps as the processors' _get_gmail_client
+    token, expiry = await credentials.get_access_token(EMAIL, REFRESH_TOKEN)
+    entry = cache.get(EMAIL)
+    if entry and entry[0] == token: return entry[1]
+    client = make_client(Credentials(token, expiry=expiry))
+    cache.put(EMAIL, (token, client), expiry)
+    return client
+
+
+async def _time(event) -> float:
+    await event()  # Warm-up; for the cached cases this is the one refresh and build
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await event()
+    return time.perf_counter() - start
+
+
+def _report(label: str, seconds: float) -> None:
+    print(f"{label:<58} {seconds / ITERATIONS * 1e6:>10.1f} us/event")
+
+
+async def _run() -> None:
+    AsyncGmailClient._shared_http = httpx.AsyncClient(transport=httpx.MockTransport(_token_endpoint))
+    credentials = CredentialManager("bench-client", "bench-secret")
+    preload_discovery_docs(('gmail', 'v1'), ('oauth2', 'v2'))
+
+    def async_client(creds):
+        return AsyncGmailClient(creds.token)
+
+    def discovery_client(creds):
+        return build('gmail', 'v1', credentials=creds, cache_discovery=False)
+
+    def preloaded_client(creds):
+        return build_service('gmail', 'v1', creds)
+
+    before = await _time(lambda: _per_event_refresh(async_client))
+    _report("before: refresh + AsyncGmailClient per event", before)
+    cache = GmailServiceCache()
+    after = await _time(lambda: _cached(credentials, cache, async_client))
+    _report("after: CredentialManager + cached AsyncGmailClient", after)
+
+    api_before = await _time(lambda: _per_event_refresh(discovery_client))
+    _report("before: refresh + build('gmail', 'v1') per event", api_before)
+    api_cache = GmailServiceCache()
+    api_after = await _time(lambda: _cached(credentials, api_cache, preloaded_client))
+    _report("after: CredentialManager + cached build_service('gmail')", api_after)
+
+    creds = Credentials("bench-token", expiry=datetime.utcnow() + timedelta(hours=1))
+    oauth_before = await _time(lambda: asyncio.sleep(0, build('oauth2', 'v2', credentials=creds, cache_discovery=False)))
+    _report("before: build('oauth2', 'v2') per callback", oauth_before)
+    oauth_after = await _time(lambda: asyncio.sleep(0, build_service('oauth2', 'v2', creds)))
+    _report("after: build_service('oauth2', 'v2')", oauth_after)
+
+    print(f"\nAsyncGmailClient setup speedup: {before / max(after, 1e-9):.0f}x")
+    print(f"Gmail API client setup speedup: {api_before / max(api_after, 1e-9):.0f}x")
+    print(f"OAuth2 setup speedup:           {oauth_before / max(oauth_after, 1e-9):.1f}x")
+    print(f"Token refreshes by CredentialManager: {credentials.refreshes}")
+
+    await credentials.close()
+    await AsyncGmailClient.close_shared_http()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run())
@@ -1,76 +1,298 @@
 import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
 from abc import ABC, abstractmethod
-import google.generativeai as genai
+from collections import deque
+from typing import Dict, Optional, Type
+from common.rate_limiter import RateLimiter, get_rate_limiter
+from common.prompt_budget import PromptBudgeter
+
+# Room for the reply on top of the counted prompt, used for tokens/min admission
+OUTPUT_TOKEN_ALLOWANCE = 512
+
+# Shared so tiktoken encodings are loaded once per model
+_token_counter = PromptBudgeter()
+
+# Failed calls come back as summaries like "[Gemini Error]: ..." or "[AI ERROR]: ...";
+# these must never be cached, folded into digests or indexed for retrieval
+ERROR_SUMMARY_PATTERN = re.compile(r"^\[[\w ]*error\]", re.IGNORECASE)
+
+
+def is_error_summary(summary: Optional[str]) -> bool:
+    return bool(summary) and bool(ERROR_SUMMARY_PATTERN.match(summary))
 
 # Abstract Strategy
 class AIService(ABC):
+    # Shared per provider API key; None means calls are not rate limited
+    limiter: Optional[RateLimiter] = None
+    model_name: str = ""
+
     @abstractmethod
     def summarize(self, text: str, prompt: str) -> str:
         pass
 
+    @abstractmethod
+    async def summarize_async(self, text: str, prompt: str) -> str:
+        # Non-blocking variant used by the asyncio pipeline; summarize() is kept for sync callers
+        pass
+
+    @abstractmethod
+    async def generate_async(self, prompt: str, system: Optional[str] = None, json_mode: bool = False,
+                             admitted: bool = False) -> str:
+        # Raw completion without truncation; raises on provider errors instead of returning an error string.
+        # admitted=True skips the quota wait because the caller already did admit() for this prompt
+        pass
+
+    async def admit(self, prompt: str, system: Optional[str] = None) -> None:
+        # Waits for quota on its own, so callers that time the call (AIRouter) can leave the wait out
+        await self._admit(system, prompt)
+
+    async def _admit(self, *texts: Optional[str]) -> None:
+        # Queue for provider quota before calling out, instead of bursting into 429s
+        if self.limiter is not None:
+            # Same counting as the prompt budgeter, so admission and the budget agree on prompt size
+            estimated = sum(_token_counter.count_tokens(t, self.model_name) for t in texts if t) + OUTPUT_TOKEN_ALLOWANCE
+            await self.limiter.acquire(estimated)
+
 # Concrete Strategy 1: Gemini
 class GeminiService(AIService):
-    def __init__(self):
+    def __init__(self, model_name: Optional[str] = None):
+        # Imported here so the local provider runs without the Gemini SDK installed
+        import google.generativeai as genai
+
         api_key = os.getenv("GEMINI_API_KEY")
-        # Pull model from env, default to 'gemini-1.5-flash' if missing
-        self.model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        # Model ladder choice, else pull model from env, default to 'gemini-1.5-flash' if missing
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
         
         if not api_key:
             raise ValueError("GEMINI_API_KEY missing in .env")
             
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(self.model_name)
+        self.limiter = get_rate_limiter(
+            "gemini", api_key,
+            int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "1000")),
+            int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+        )
 
     def summarize(self, text: str, prompt: str) -> str:
         try:
-            full_prompt = f"{prompt}\n\nEMAIL CONTENT:\n{text[:8000]}"
-            response = self.model.generate_content(full_prompt)
+            response = self.model.generate_content(self._build_prompt(text, prompt))
             return response.text.strip()
         except Exception as e:
             return f"[Gemini Error]: {str(e)}"
 
+    async def summarize_async(self, text: str, prompt: str) -> str:
+        try:
+            return await self.generate_async(self._build_prompt(text, prompt))
+        except Exception as e:
+            return f"[Gemini Error]: {str(e)}"
+
+    async def generate_async(self, prompt: str, system: Optional[str] = None, json_mode: bool = False,
+                             admitted: bool = False) -> str:
+        full_prompt = f"{system}\n\n{prompt}" if system else prompt
+        generation_config = {"response_mime_type": "application/json"} if json_mode else None
+        if not admitted:
+            await self.admit(prompt, system)
+        response = await self.model.generate_content_async(full_prompt, generation_config=generation_config)
+        return response.text.strip()
+
+    def _build_prompt(self, text: str, prompt: str) -> str:
+        return f"{prompt}\n\nEMAIL CONTENT:\n{text}"
+
 # Concrete Strategy 2: OpenAI
 class OpenAIService(AIService):
-    def __init__(self):
+    def __init__(self, model_name: Optional[str] = None):
         # We import here to avoid crashing if user doesn't have openai installed
         try:
-            from openai import OpenAI
+            from openai import OpenAI, AsyncOpenAI
         except ImportError:
             raise ImportError("Run 'pip install openai' to use OpenAI strategy.")
 
         api_key = os.getenv("OPENAI_API_KEY")
-        self.model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.model_name = model_name or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         
         if not api_key:
             raise ValueError("OPENAI_API_KEY missing in .env")
             
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
+        self.limiter = get_rate_limiter(
+            "openai", api_key,
+            int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500")),
+            int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+        )
 
     def summarize(self, text: str, prompt: str) -> str:
         try:
             response = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Email Content:\n{text[:8000]}"}
-                ]
+                messages=self._build_messages(text, prompt)
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
             return f"[OpenAI Error]: {str(e)}"
 
+    async def summarize_async(self, text: str, prompt: str) -> str:
+        try:
+            return await self.generate_async(f"Email Content:\n{text}", system=prompt)
+        except Exception as e:
+            return f"[OpenAI Error]: {str(e)}"
+
+    async def generate_async(self, prompt: str, system: Optional[str] = None, json_mode: bool = False,
+                             admitted: bool = False) -> str:
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        if not admitted:
+            await self.admit(prompt, system)
+        response = await self.async_client.chat.completions.create(
+            model=self.model_name, messages=messages, **kwargs
+        )
+        return response.choices[0].message.content.strip()
+
+    def _build_messages(self, text: str, prompt: str) -> list:
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": f"Email Content:\n{text}"}
+        ]
+
+# Concrete Strategy 3: Local stand-in for load testing (no network, no API key)
+class LocalAIService(AIService):
+    # Summaries are a pure function of the input; latency and errors are seeded from it too,
+    # so a replayed load test behaves the same regardless of scheduling order
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or os.getenv("LOCAL_AI_MODEL", "local-fake")
+        self.latency_median_ms = float(os.getenv("LOCAL_AI_LATENCY_MEDIAN_MS", "300"))
+        self.latency_sigma = float(os.getenv("LOCAL_AI_LATENCY_SIGMA", "0.5"))  # Lognormal spread; 0 = fixed latency
+        self.error_rate = float(os.getenv("LOCAL_AI_ERROR_RATE", "0"))
+        self.quota_per_minute = int(os.getenv("LOCAL_AI_QUOTA_PER_MINUTE", "0"))  # Simulated server-side 429s; 0 = none
+        self.seed = os.getenv("LOCAL_AI_SEED", "0")
+        self._recent_requests = deque()
+        self._quota_lock = threading.Lock()
+        self.limiter = get_rate_limiter(
+            "local", "local",
+            int(os.getenv("LOCAL_AI_REQUESTS_PER_MINUTE", "0")),
+            int(os.getenv("LOCAL_AI_TOKENS_PER_MINUTE", "0"))
+        )
+
+    def summarize(self, text: str, prompt: str) -> str:
+        try:
+            time.sleep(self._simulate(prompt + text))
+            return self._summary(text)
+        except Exception as e:
+            return f"[Local Error]: {str(e)}"
+
+    async def summarize_async(self, text: str, prompt: str) -> str:
+        try:
+            return await self.generate_async(text, system=prompt)
+        except Exception as e:
+            return f"[Local Error]: {str(e)}"
+
+    async def generate_async(self, prompt: str, system: Optional[str] = None, json_mode: bool = False,
+                             admitted: bool = False) -> str:
+        if not admitted:
+            await self.admit(prompt, system)
+        await asyncio.sleep(self._simulate(f"{system}{prompt}"))
+        if not json_mode:
+            return self._summary(prompt)
+
+        # Answer batched prompts ("### EMAIL id=N" sections) with one summary per section
+        sections = re.split(r"^### EMAIL id=(\d+)\s*$", prompt, flags=re.MULTILINE)
+        summaries = [
+            {"id": int(email_id), "summary": self._summary(body)}
+            for email_id, body in zip(sections[1::2], sections[2::2])
+        ]
+        return json.dumps({"summaries": summaries} if summaries else {"summary": self._summary(prompt)})
+
+    def _simulate(self, key: str) -> float:
+        # Returns the latency to wait, or raises a simulated provider error
+        self._check_quota()
+        rng = random.Random(hashlib.sha256(f"{self.seed}:{key}".encode("utf-8")).digest())
+        if rng.random() < self.error_rate:
+            raise RuntimeError("500 Internal error (simulated)")
+        return rng.lognormvariate(0, self.latency_sigma) * self.latency_median_ms / 1000
+
+    def _check_quota(self):
+        if self.quota_per_minute <= 0:
+            return
+        now = time.monotonic()
+        with self._quota_lock:
+            while self._recent_requests and now - self._recent_requests[0] > 60:
+                self._recent_requests.popleft()
+            if len(self._recent_requests) >= self.quota_per_minute:
+                raise RuntimeError("429 Resource has been exhausted (simulated quota)")
+            self._recent_requests.append(now)
+
+    def _summary(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+        return f"[local:{digest}] Summary of a {len(text.split())}-word message."
+
 # The Factory
 class AIFactory:
-    _services = {}
+    # Provider name -> strategy class; one client per provider and model is built lazily and reused
+    _providers: Dict[str, Type[AIService]] = {
+        "gemini": GeminiService,
+        "openai": OpenAIService,
+        "local": LocalAIService,
+        "fake": LocalAIService,
+    }
+    _services: Dict[str, AIService] = {}
+    _lock = threading.Lock()
 
-    @staticmethod
-    def get_service(provider_name: str) -> AIService:
-        # Re-initialize every time to ensure env var changes are picked up (optional)
-        # or keep the caching logic if you prefer performance.
-        
-        if provider_name == "gemini":
-            return GeminiService()
-        elif provider_name == "openai":
-            return OpenAIService()
-        else:
-            raise ValueError(f"Unknown AI Provider: {provider_name}")
\ No newline at end of file
+    @classmethod
+    def register(cls, provider_name: str, service_cls: Type[AIService]) -> None:
+        with cls._lock:
+            cls._providers[provider_name] = service_cls
+            cls._drop(provider_name)
+
+    @classmethod
+    def get_service(cls, provider_name: str, model_name: Optional[str] = None) -> AIService:
+        # Clients (and their HTTP connection pools) live for the whole process.
+        # model_name picks a model from the provider's ladder; None uses the provider default
+        key = f"{provider_name}:{model_name}" if model_name else provider_name
+        service = cls._services.get(key)
+        if service is not None:
+            return service
+
+        with cls._lock:
+            if key not in cls._services:
+                service_cls = cls._providers.get(provider_name)
+                if service_cls is None:
+                    raise ValueError(f"Unknown AI Provider: {provider_name}")
+                cls._services[key] = service_cls(model_name) if model_name else service_cls()
+            return cls._services[key]
+
+    @classmethod
+    def is_simulated(cls, provider_name: str) -> bool:
+        # Load-test stand-ins; real and simulated providers must never fail over to each other
+        service_cls = cls._providers.get(provider_name)
+        return service_cls is not None and issubclass(service_cls, LocalAIService)
+
+    @classmethod
+    def stats(cls) -> Dict[str, dict]:
+        # Rate limiter admission/wait metrics for every provider built so far (models share their provider's limiter)
+        return {
+            name.split(":")[0]: service.limiter.stats() for name, service in cls._services.items() if service.limiter
+        }
+
+    @classmethod
+    def reload(cls, provider_name: Optional[str] = None) -> None:
+        # Drop cached clients so the next get_service() picks up changed env/config;
+        # rebuilt clients get a new rate limiter only if their RPM/TPM changed
+        with cls._lock:
+            if provider_name is None:
+                cls._services.clear()
+            else:
+                cls._drop(provider_name)
+
+    @classmethod
+    def _drop(cls, provider_name: str) -> None:
+        # Caller holds _lock; removes the provider's default and ladder-model clients
+        for key in [k for k in cls._services if k.split(":")[0] == provider_name]:
+            del cls._services[key]
@@ -0,0 +1,423 @@
+"""
+AI Router module for the Mail AI Backend application.
+
+This module routes LLM calls across the configured AI providers. It keeps a
+rolling window of latency and errors per provider, trips a circuit breaker
+when a provider keeps failing, and fails over to the next healthiest provider
+the user allows. Calls to providers configured for hedging send a second
+request when the first is slower than that provider's usual latency. It
+follows the Single Responsibility Principle by handling only provider
+selection; the calls themselves are made by AIFactory services.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from common.ai_factory import AIFactory
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """
+    Rolling latency/error statistics and circuit breaker for one provider.
+
+    The circuit opens after ``failure_threshold`` consecutive failures and
+    stays open for ``cooldown_seconds``; then a single probe request is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, window: int = 100, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        """
+        Initialize ProviderHealth.
+
+        Args:
+            window: Number of recent calls kept for latency/error statistics.
+            failure_threshold: Consecutive failures that open the circuit.
+            cooldown_seconds: Time the circuit stays open before a probe.
+        """
+        self._samples: deque = deque(maxlen=window)
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown_seconds
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.state = CLOSED
+
+    def available(self) -> bool:
+        """
+        Check whether a request may be sent without claiming the probe slot.
+
+        Returns:
+            True if the circuit is closed or a probe is due.
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at >= self._cooldown
+        return not self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """
+        Admit a request, moving an expired open circuit to half-open.
+
+        Returns:
+            True if the request may be sent.
+        """
+        if not self.available():
+            return False
+        if self.state != CLOSED:
+            self.state = HALF_OPEN
+            self._probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """
+        Free the half-open probe slot without recording an outcome,
+        e.g. when the probe request was cancelled because a hedge won.
+        """
+        self._probe_in_flight = False
+
+    def record(self, latency: float, ok: bool) -> None:
+        """
+        Record the outcome of a call.
+
+        Args:
+            latency: Call duration in seconds.
+            ok: Whether the call succeeded.
+        """
+        self._samples.append((latency, ok))
+        self._probe_in_flight = False
+        if ok:
+            self._consecutive_failures = 0
+            self.state = CLOSED
+            return
+
+        self._consecutive_failures += 1
+        if self.state == HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def error_rate(self) -> float:
+        """
+        Fraction of failed calls in the window.
+
+        Returns:
+            Error rate between 0 and 1.
+        """
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def successes(self) -> int:
+        """
+        Number of successful calls in the window.
+
+        Returns:
+            Count of successful samples.
+        """
+        return sum(1 for _, ok in self._samples if ok)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """
+        Latency percentile of successful calls in the window.
+
+        Args:
+            percentile: Percentile between 0 and 100.
+
+        Returns:
+            Latency in seconds, or None without successful samples.
+        """
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        index = min(int(len(latencies) * percentile / 100), len(latencies) - 1)
+        return latencies[index]
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Return health statistics.
+
+        Returns:
+            Dictionary with state, error rate and latency percentiles.
+        """
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            "state": self.state,
+            "calls": len(self._samples),
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+        }
+
+
+class AIRouter:
+    """
+    Picks the provider order for each call and fails over on errors.
+
+    The user's preferred provider goes first unless its circuit is open or
+    its rolling p95 latency is more than ``slow_factor`` times that of the
+    fastest alternative; the remaining allowed providers follow ordered by
+    error rate and p95 latency. Failover only happens between the configured
+    ``providers``, and never between simulated (local/fake) and real ones, so
+    a load test cannot spill synthetic mail onto paid providers.
+
+    For providers listed in ``hedge_percentiles``, if an attempt has not
+    finished within that percentile of the provider's recent latency, a hedge
+    request goes to the next candidate (or the same provider) and whichever
+    succeeds first wins; the other is cancelled. Hedges are capped at
+    ``hedge_budget_ratio`` of all calls.
+    """
+
+    def __init__(self, providers: List[str], window: int = 100, failure_threshold: int = 5,
+                 cooldown_seconds: float = 30.0, attempt_timeout_seconds: float = 30.0,
+                 slow_factor: float = 3.0, hedge_percentiles: Optional[Dict[str, float]] = None,
+                 hedge_budget_ratio: float = 0.05, hedge_min_samples: int = 20):
+        """
+        Initialize AIRouter.
+
+        Args:
+            providers: Provider names eligible for failover.
+            window: Calls kept per provider for statistics.
+            failure_threshold: Consecutive failures that open a circuit.
+            cooldown_seconds: Time a circuit stays open before a probe.
+            attempt_timeout_seconds: Per-provider attempt timeout.
+            slow_factor: p95 ratio at which the preferred provider is demoted.
+            hedge_percentiles: Provider name -> latency percentile after which
+                a hedge is sent; providers not listed are never hedged.
+            hedge_budget_ratio: Maximum hedges as a fraction of all calls.
+            hedge_min_samples: Successful calls needed before hedging a provider.
+        """
+        self._providers = list(providers)
+        self._timeout = attempt_timeout_seconds
+        self._slow_factor = slow_factor
+        self._hedge_percentiles = hedge_percentiles or {}
+        self._hedge_budget_ratio = hedge_budget_ratio
+        self._hedge_min_samples = hedge_min_samples
+        self._health: Dict[str, ProviderHealth] = {}
+        self._health_args = (window, failure_threshold, cooldown_seconds)
+        self.calls = 0
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def health(self, provider_name: str) -> ProviderHealth:
+        """
+        Return (creating if needed) the health tracker for a provider.
+
+        Args:
+            provider_name: Provider name.
+
+        Returns:
+            ProviderHealth instance.
+        """
+        health = self._health.get(provider_name)
+        if health is None:
+            health = self._health[provider_name] = ProviderHealth(*self._health_args)
+        return health
+
+    def candidates(self, preferred: str, allowed: Optional[List[str]] = None) -> List[str]:
+        """
+        Order the providers to try for one call.
+
+        Args:
+            preferred: The user's configured provider.
+            allowed: Providers the user permits; None allows all configured ones.
+
+        Returns:
+            Provider names, best first; empty if every circuit is open.
+        """
+        if preferred in self._providers:
+            simulated = AIFactory.is_simulated(preferred)
+            pool = [preferred] + [
+                p for p in self._providers if p != preferred and AIFactory.is_simulated(p) == simulated
+            ]
+        else:
+            pool = [preferred]  # Not a failover provider: it is tried alone
+        if allowed is not None:
+            pool = [p for p in pool if p in allowed] or [preferred]
+
+        live = [p for p in pool if self.health(p).available()]
+
+        def score(name: str) -> Tuple[float, float]:
+            health = self.health(name)
+            p95 = health.latency_percentile(95)
+            return health.error_rate(), p95 if p95 is not None else 0.0
+
+        others = sorted((p for p in live if p != preferred), key=score)
+        if preferred not in live:
+            # Open circuit: fail fast over to the alternatives (or to nothing)
+            return others
+        preferred_p95 = self.health(preferred).latency_percentile(95)
+        best_other_p95 = self.health(others[0]).latency_percentile(95) if others else None
+        if preferred_p95 and best_other_p95 and preferred_p95 > self._slow_factor * best_other_p95:
+            return others + [preferred]
+        return [preferred] + others
+
+    async def call(self, preferred: str, allowed: Optional[List[str]],
+                   attempt: Callable[[str], Awaitable[str]],
+                   admit: Optional[Callable[[str], Awaitable[None]]] = None) -> Tuple[str, str]:
+        """
+        Run ``attempt`` against providers in candidate order until one succeeds.
+
+        Args:
+            preferred: The user's configured provider.
+            allowed: Providers the user permits; None allows all configured ones.
+            attempt: Async callable taking a provider name; must raise on failure.
+            admit: Async callable taking a provider name that waits for that
+                provider's rate limit. It runs before the attempt's timeout,
+                latency measurement and hedge timer, so queueing at our own
+                quota is never counted as provider slowness or failure.
+
+        Returns:
+            Tuple of (provider used, result).
+
+        Raises:
+            Exception: The last provider error if every candidate failed.
+        """
+        last_error: Exception = RuntimeError(f"No AI provider available (circuit open for {preferred})")
+        candidates = self.candidates(preferred, allowed)
+        for index, name in enumerate(candidates):
+            if not self.health(name).allow_request():
+                continue
+            if index > 0:
+                self.failovers += 1
+
+            try:
+                return await self._attempt_hedged(name, candidates[index + 1:], attempt, admit)
+            except Exception as e:
+                print(f"[AI Router] {name} failed ({type(e).__name__}: {e}); trying next provider")
+                last_error = e
+
+        raise last_error
+
+    async def _attempt_hedged(self, name: str, alternatives: List[str],
+                              attempt: Callable[[str], Awaitable[str]],
+                              admit: Optional[Callable[[str], Awaitable[None]]] = None) -> Tuple[str, str]:
+        """
+        Run one attempt, adding a hedge request if it is unusually slow.
+
+        Args:
+            name: Provider for the primary request (already admitted).
+            alternatives: Lower-ranked candidates a hedge may go to.
+            attempt: Async callable taking a provider name.
+            admit: Async callable waiting for a provider's rate limit.
+
+        Returns:
+            Tuple of (provider that answered first, result).
+        """
+        # The hedge timer starts once the primary holds its quota, not while it queues for it
+        await self._admit(name, admit)
+        delay = self._hedge_delay(name)
+        primary = asyncio.ensure_future(self._attempt(name, attempt))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            hedge_name = next((alt for alt in alternatives if self.health(alt).allow_request()), name)
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._attempt(hedge_name, attempt, admit))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary.result()
+        finally:
+            # Cancel the slower request (or everything, if we were cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _admit(self, name: str, admit: Optional[Callable[[str], Awaitable[None]]]) -> None:
+        """
+        Wait for a provider's rate limit outside any timed or recorded span.
+
+        Args:
+            name: Provider name (already admitted by its circuit breaker).
+            admit: Async callable waiting for the provider's rate limit, or None.
+        """
+        if admit is None:
+            return
+        try:
+            await admit(name)
+        except BaseException:
+            # Nothing was sent; free a half-open probe slot rather than blaming the provider
+            self.health(name).release_probe()
+            raise
+
+    async def _attempt(self, name: str, attempt: Callable[[str], Awaitable[str]],
+                       admit: Optional[Callable[[str], Awaitable[None]]] = None) -> Tuple[str, str]:
+        """
+        Run a single provider request with a timeout, recording its outcome.
+
+        Args:
+            name: Provider name.
+            attempt: Async callable taking a provider name.
+            admit: Async callable waiting for the provider's rate limit; it
+                runs before the timeout and latency measurement start.
+
+        Returns:
+            Tuple of (provider name, result).
+        """
+        await self._admit(name, admit)
+        self.calls += 1
+        health = self.health(name)
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(attempt(name), self._timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race: neither a success nor a provider failure
+            health.release_probe()
+            raise
+        except Exception:
+            health.record(time.monotonic() - start, ok=False)
+            raise
+        health.record(time.monotonic() - start, ok=True)
+        return name, result
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        """
+        Delay after which a hedge is sent for this provider, if hedging applies.
+
+        Args:
+            name: Provider name.
+
+        Returns:
+            Seconds to wait before hedging, or None to not hedge this call.
+        """
+        percentile = self._hedge_percentiles.get(name)
+        if percentile is None or self.hedges >= self._hedge_budget_ratio * self.calls:
+            return None
+        health = self.health(name)
+        if health.successes() < self._hedge_min_samples:
+            return None
+        return health.latency_percentile(percentile)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Return per-provider health and the failover counter.
+
+        Returns:
+            Dictionary of routing statistics.
+        """
+        stats: Dict[str, object] = {name: health.stats() for name, health in self._health.items()}
+        stats["failovers"] = self.failovers
+        stats["hedges"] = self.hedges
+        stats["hedge_wins"] = self.hedge_wins
+        return stats
@@ -0,0 +1,232 @@
+"""
+Credential Manager module for the Mail AI Backend application.
+
+This module caches Google OAuth access tokens per user and refreshes them
+before they expire, so that most events need no token round trip at all.
+It follows the Single Responsibility Principle by handling only access token
+lifetime.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from common.gmail_client import AsyncGmailClient
+
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+
+# Token endpoint answers that no retry will fix (invalid_grant, invalid_client):
+# the refresh token was revoked or expired, or the client is misconfigured
+PERMANENT_REFRESH_STATUSES = (400, 401)
+
+
+class TokenRefreshError(Exception):
+    """
+    Raised when Google refuses to exchange a refresh token for an access token.
+
+    Attributes:
+        permanent: True if retrying with the same refresh token cannot succeed,
+            so the user has to sign in again.
+    """
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class CredentialManager:
+    """
+    Per-user access token cache with expiry-aware, single-flight refresh.
+
+    Tokens are served from memory until ``refresh_margin_seconds`` before
+    expiry. Concurrent requests for the same user share one refresh call,
+    and tokens of users that were active recently are refreshed in the
+    background ahead of expiry. Users that stayed idle for a whole token
+    lifetime are forgotten, so memory follows the active users rather than
+    every user ever seen. Callers should ask for the token on every event (a
+    memory hit) so that activity is tracked.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, refresh_margin_seconds: int = 300):
+        """
+        Initialize CredentialManager.
+
+        Args:
+            client_id: Google OAuth client ID.
+            client_secret: Google OAuth client secret.
+            refresh_margin_seconds: How long before expiry a token is refreshed.
+        """
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._margin = timedelta(seconds=refresh_margin_seconds)
+        self._tokens: Dict[str, Tuple[str, datetime]] = {}
+        self._refresh_tokens: Dict[str, str] = {}
+        self._last_used: Dict[str, datetime] = {}
+        self._issued_at: Dict[str, datetime] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self.refreshes = 0
+        self.cache_hits = 0
+
+    async def get_access_token(self, email: str, refresh_token: str) -> Tuple[str, datetime]:
+        """
+        Return a valid access token for the user, refreshing only if needed.
+
+        Args:
+            email: User's email address.
+            refresh_token: User's OAuth refresh token.
+
+        Returns:
+            Tuple of (access_token, expiry) where expiry is a naive UTC datetime.
+
+        Raises:
+            TokenRefreshError: If Google rejects the refresh token.
+        """
+        now = datetime.utcnow()
+
+        # A re-authorised user invalidates whatever we had cached
+        if self._refresh_tokens.get(email) != refresh_token:
+            self.invalidate(email)
+            self._refresh_tokens[email] = refresh_token
+
+        cached = self._tokens.get(email)
+        if cached and cached[1] - self._margin > now:
+            self.cache_hits += 1
+            token = cached
+        else:
+            token = await self._refresh(email, refresh_token)
+
+        # Recorded after any refresh, so the token just issued counts as used
+        self._last_used[email] = datetime.utcnow()
+        return token
+
+    def invalidate(self, email: str) -> None:
+        """
+        Forget everything cached for a user, e.g. after Gmail answered 401.
+
+        Args:
+            email: User's email address.
+        """
+        self._tokens.pop(email, None)
+        self._refresh_tokens.pop(email, None)
+        self._last_used.pop(email, None)
+        self._issued_at.pop(email, None)
+        timer = self._timers.pop(email, None)
+        if timer:
+            timer.cancel()
+
+    async def close(self) -> None:
+        """
+        Cancel scheduled background refreshes and wait for in-flight ones.
+        """
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    async def _refresh(self, email: str, refresh_token: str) -> Tuple[str, datetime]:
+        """
+        Refresh a user's token, sharing one request among concurrent callers.
+
+        Args:
+            email: User's email address.
+            refresh_token: User's OAuth refresh token.
+
+        Returns:
+            Tuple of (access_token, expiry).
+        """
+        task = self._inflight.get(email)
+        if task is None:
+            task = asyncio.create_task(self._fetch_token(email, refresh_token))
+            self._inflight[email] = task
+            task.add_done_callback(lambda _: self._inflight.pop(email, None))
+
+        # Shield so one cancelled caller does not cancel the refresh for everyone
+        return await asyncio.shield(task)
+
+    async def _fetch_token(self, email: str, refresh_token: str) -> Tuple[str, datetime]:
+        """
+        Exchange the refresh token for a new access token and cache it.
+
+        Args:
+            email: User's email address.
+            refresh_token: User's OAuth refresh token.
+
+        Returns:
+            Tuple of (access_token, expiry).
+        """
+        response = await AsyncGmailClient.get_shared_http().post(
+            GOOGLE_TOKEN_URI,
+            data={
+                'grant_type': 'refresh_token',
+                'refresh_token': refresh_token,
+                'client_id': self._client_id,
+                'client_secret': self._client_secret
+            }
+        )
+        if response.status_code != 200:
+            self.invalidate(email)
+            raise TokenRefreshError(f"Token refresh failed for {email}: {response.status_code} {response.text}",
+                                    permanent=response.status_code in PERMANENT_REFRESH_STATUSES)
+
+        payload = response.json()
+        issued_at = datetime.utcnow()
+        token = (payload['access_token'], issued_at + timedelta(seconds=int(payload.get('expires_in', 3600))))
+        self._tokens[email] = token
+        self._issued_at[email] = issued_at
+        self.refreshes += 1
+        self._schedule_refresh(email, token[1])
+        return token
+
+    def _schedule_refresh(self, email: str, expiry: datetime) -> None:
+        """
+        Arrange a background refresh shortly before the token expires.
+
+        Args:
+            email: User's email address.
+            expiry: Expiry of the token just fetched.
+        """
+        previous = self._timers.pop(email, None)
+        if previous:
+            previous.cancel()
+
+        now = datetime.utcnow()
+        delay = (expiry - self._margin - now).total_seconds()
+        loop = asyncio.get_running_loop()
+        if delay <= 0:
+            # Too short-lived to refresh ahead; still forget the user once it has expired
+            self._timers[email] = loop.call_later(max((expiry - now).total_seconds(), 0), self.invalidate, email)
+            return
+        self._timers[email] = loop.call_later(delay, self._background_refresh, email)
+
+    def _background_refresh(self, email: str) -> None:
+        """
+        Timer callback: refresh proactively if the user was active this token lifetime.
+
+        Args:
+            email: User's email address.
+        """
+        self._timers.pop(email, None)
+        issued_at = self._issued_at.get(email)
+        last_used: Optional[datetime] = self._last_used.get(email)
+        refresh_token = self._refresh_tokens.get(email)
+
+        # Idle mailboxes are dropped and refresh lazily on their next event
+        if not refresh_token or not last_used or not issued_at or last_used < issued_at:
+            self.invalidate(email)
+            return
+
+        task = asyncio.ensure_future(self._refresh(email, refresh_token))
+        task.add_done_callback(self._log_background_failure)
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Future) -> None:
+        """
+        Report a failed background refresh without raising into the loop.
+
+        Args:
+            task: Completed refresh task.
+        """
+        if not task.cancelled() and task.exception():
+            print(f"[Credential Manager Error]: Background refresh failed: {task.exception()}")
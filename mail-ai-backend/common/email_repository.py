@@ -50,19 +50,22 @@ class MongoEmailRepository(IEmailRepository):
         if logs:
             await self._collection.insert_many(logs)
 
-    async def get_thread_logs(self, thread_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_thread_logs(self, thread_id: str, limit: int = 10, latest: bool = False) -> List[Dict[str, Any]]:
         """
         Retrieve email logs for a specific thread, sorted by timestamp.
 
         Args:
             thread_id: Gmail thread ID.
             limit: Maximum number of logs to return.
+            latest: Return the newest ``limit`` logs instead of the oldest.
+                Either way the list is oldest first.
 
         Returns:
             List of email log dictionaries for the thread.
         """
-        cursor = self._collection.find({"thread_id": thread_id}).sort("timestamp", 1).limit(limit)
-        return await cursor.to_list(length=limit)
+        cursor = self._collection.find({"thread_id": thread_id}).sort("timestamp", -1 if latest else 1).limit(limit)
+        logs = await cursor.to_list(length=limit)
+        return logs[::-1] if latest else logs
 
     async def get_user_logs(self, email: str, limit: int, direction: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,130 @@
+"""
+Gmail Batch module for the Mail AI Backend application.
+
+This module fetches many Gmail messages or threads in as few HTTP round trips
+as possible using Gmail's batch endpoint. It follows the Single Responsibility
+Principle by focusing solely on bulk retrieval.
+"""
+
+import asyncio
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlencode
+from common.gmail_client import AsyncGmailClient, GmailApiError, GMAIL_API_PATH
+
+# The message or thread was deleted (or moved out of reach) since it was listed
+GONE_STATUSES = (404,)
+
+
+class GmailBatchFetcher:
+    """
+    Bulk fetcher for Gmail messages and threads.
+
+    Packs up to ``MAX_BATCH_SIZE`` get requests into each batch HTTP request
+    and sends the batches concurrently. Requests answered with 404 refer to
+    messages deleted since they were listed; they are logged and left out,
+    so a vanished message cannot block its history range forever. Any other
+    failure (401/403, 429, 5xx, network) is raised, so an expired token or a
+    transient error is never mistaken for a deleted message.
+    """
+
+    # Gmail rejects batches larger than 100 and throttles above ~50
+    MAX_BATCH_SIZE = 50
+
+    def __init__(self, batch_size: int = MAX_BATCH_SIZE):
+        """
+        Initialize GmailBatchFetcher.
+
+        Args:
+            batch_size: Number of requests per batch HTTP call.
+        """
+        self._batch_size = min(batch_size, self.MAX_BATCH_SIZE)
+
+    async def get_messages(self, gmail_client: AsyncGmailClient, message_ids: List[str], format: str = 'full',
+                           metadata_headers: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several messages in batched round trips.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            message_ids: Gmail message IDs to fetch.
+            format: Gmail message format ('full', 'metadata', 'minimal').
+            metadata_headers: Headers to include when format is 'metadata'.
+
+        Returns:
+            Dictionary mapping message ID to the Gmail message resource.
+        """
+        params = [('format', format)] + [('metadataHeaders', h) for h in metadata_headers or []]
+        query = urlencode(params)
+        return await self._execute(
+            gmail_client,
+            {message_id: f"{GMAIL_API_PATH}/messages/{message_id}?{query}" for message_id in message_ids}
+        )
+
+    async def get_threads(self, gmail_client: AsyncGmailClient, thread_ids: List[str],
+                          format: str = 'full') -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several threads in batched round trips.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            thread_ids: Gmail thread IDs to fetch.
+            format: Gmail thread format ('full', 'metadata', 'minimal').
+
+        Returns:
+            Dictionary mapping thread ID to the Gmail thread resource.
+        """
+        query = urlencode({'format': format})
+        return await self._execute(
+            gmail_client,
+            {thread_id: f"{GMAIL_API_PATH}/threads/{thread_id}?{query}" for thread_id in thread_ids}
+        )
+
+    async def _execute(self, gmail_client: AsyncGmailClient, paths: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Execute keyed GET requests in chunks of at most ``batch_size``.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            paths: Dictionary mapping a request key to a Gmail API path.
+
+        Returns:
+            Dictionary mapping request key to its response.
+
+        Raises:
+            Exception: The first failure other than a 404, e.g. GmailApiError
+                for 401/429/5xx or an httpx error.
+        """
+        keys = list(paths)
+        if not keys:
+            return {}
+
+        if len(keys) == 1:
+            # A single request gains nothing from the multipart envelope
+            try:
+                return {keys[0]: await gmail_client.get(paths[keys[0]])}
+            except GmailApiError as e:
+                if e.status not in GONE_STATUSES:
+                    raise
+                print(f"[Gmail Batch Error]: Request {keys[0]} failed: {e}")
+                return {}
+
+        chunks = [
+            {key: paths[key] for key in keys[start:start + self._batch_size]}
+            for start in range(0, len(keys), self._batch_size)
+        ]
+        responses = await asyncio.gather(
+            *(gmail_client.batch_get(chunk) for chunk in chunks), return_exceptions=True
+        )
+
+        results = {}
+        for response in responses:
+            if isinstance(response, BaseException):
+                raise response
+            for key, result in response.items():
+                if isinstance(result, GmailApiError):
+                    if result.status not in GONE_STATUSES:
+                        raise result
+                    print(f"[Gmail Batch Error]: Request {key} failed: {result}")
+                    continue
+                results[key] = result
+        return results
@@ -0,0 +1,289 @@
+"""
+Async Gmail Client module for the Mail AI Backend application.
+
+This module provides a non-blocking Gmail REST client built on a shared
+keep-alive ``httpx.AsyncClient``. It follows the Single Responsibility
+Principle by handling only Gmail transport, so that one slow Gmail response
+never stalls the event loop for other mailboxes.
+"""
+
+import json
+import uuid
+from email.parser import BytesParser
+from typing import Dict, Any, List, Optional
+import httpx
+
+GMAIL_API_PATH = "/gmail/v1/users/me"
+GMAIL_BASE_URL = "https://gmail.googleapis.com"
+GMAIL_BATCH_PATH = "/batch/gmail/v1"
+
+
+class GmailApiError(Exception):
+    """
+    Raised when Gmail answers a request with a non-2xx status.
+    """
+
+    def __init__(self, status: int, message: str):
+        """
+        Initialize GmailApiError.
+
+        Args:
+            status: HTTP status code returned by Gmail.
+            message: Error body or description.
+        """
+        super().__init__(f"Gmail API error {status}: {message}")
+        self.status = status
+
+
+class AsyncGmailClient:
+    """
+    Awaitable Gmail API client for a single authenticated mailbox.
+
+    All instances share one connection pool, so creating a client per user
+    is cheap and TLS connections to Gmail are reused across mailboxes.
+    """
+
+    _shared_http: Optional[httpx.AsyncClient] = None
+
+    def __init__(self, access_token: str, http: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize AsyncGmailClient.
+
+        Args:
+            access_token: OAuth access token for the mailbox.
+            http: HTTP client to use instead of the shared pool.
+        """
+        self._access_token = access_token
+        self._http = http or self.get_shared_http()
+
+    @property
+    def access_token(self) -> str:
+        """
+        OAuth access token this client sends.
+
+        Returns:
+            Access token string.
+        """
+        return self._access_token
+
+    @classmethod
+    def get_shared_http(cls) -> httpx.AsyncClient:
+        """
+        Return the process-wide keep-alive HTTP client, creating it on first use.
+
+        Returns:
+            Shared httpx.AsyncClient instance.
+        """
+        if cls._shared_http is None or cls._shared_http.is_closed:
+            cls._shared_http = httpx.AsyncClient(
+                base_url=GMAIL_BASE_URL,
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+            )
+        return cls._shared_http
+
+    @classmethod
+    async def close_shared_http(cls) -> None:
+        """
+        Close the shared HTTP client and its pooled connections.
+        """
+        if cls._shared_http is not None:
+            await cls._shared_http.aclose()
+            cls._shared_http = None
+
+    async def list_messages(self, max_results: int = 100, page_token: Optional[str] = None,
+                            query: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List messages in the mailbox (``users.messages.list``).
+
+        Args:
+            max_results: Maximum number of messages to return.
+            page_token: Page token from a previous call.
+            query: Gmail search query.
+
+        Returns:
+            Gmail API response dictionary.
+        """
+        params = {'maxResults': max_results, 'pageToken': page_token, 'q': query}
+        return await self._request('GET', f"{GMAIL_API_PATH}/messages", params=params)
+
+    async def get_message(self, message_id: str, format: str = 'full',
+                          metadata_headers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Fetch a single message (``users.messages.get``).
+
+        Args:
+            message_id: Gmail message ID.
+            format: Gmail message format ('full', 'metadata', 'minimal').
+            metadata_headers: Headers to include when format is 'metadata'.
+
+        Returns:
+            Gmail message resource.
+        """
+        params = {'format': format, 'metadataHeaders': metadata_headers}
+        return await self._request('GET', f"{GMAIL_API_PATH}/messages/{message_id}", params=params)
+
+    async def list_history(self, start_history_id: str, history_types: Optional[List[str]] = None,
+                           max_results: Optional[int] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List mailbox changes since a history ID (``users.history.list``).
+
+        Args:
+            start_history_id: History ID to list changes after.
+            history_types: Restrict to these history types (e.g. 'messageAdded').
+            max_results: Maximum number of history records per page.
+            page_token: Page token from a previous call.
+
+        Returns:
+            Gmail API response dictionary.
+        """
+        params = {
+            'startHistoryId': start_history_id,
+            'historyTypes': history_types,
+            'maxResults': max_results,
+            'pageToken': page_token
+        }
+        return await self._request('GET', f"{GMAIL_API_PATH}/history", params=params)
+
+    async def get_thread(self, thread_id: str, format: str = 'full') -> Dict[str, Any]:
+        """
+        Fetch a thread with its messages (``users.threads.get``).
+
+        Args:
+            thread_id: Gmail thread ID.
+            format: Gmail thread format ('full', 'metadata', 'minimal').
+
+        Returns:
+            Gmail thread resource.
+        """
+        return await self._request('GET', f"{GMAIL_API_PATH}/threads/{thread_id}", params={'format': format})
+
+    async def watch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Start or renew push notifications for the mailbox (``users.watch``).
+
+        Args:
+            body: Watch request body (labelIds, topicName).
+
+        Returns:
+            Gmail API response with historyId and expiration.
+        """
+        return await self._request('POST', f"{GMAIL_API_PATH}/watch", json_body=body)
+
+    async def get(self, path: str) -> Dict[str, Any]:
+        """
+        Send a GET request to an arbitrary Gmail API path.
+
+        Args:
+            path: Gmail API path including any query string.
+
+        Returns:
+            Decoded JSON response.
+        """
+        return await self._request('GET', path)
+
+    async def batch_get(self, paths: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Execute several GET requests in one multipart batch round trip.
+
+        Args:
+            paths: Dictionary mapping a request key to a Gmail API path
+                (including query string), e.g. ``/gmail/v1/users/me/messages/x``.
+
+        Returns:
+            Dictionary mapping request key to the decoded response, or to a
+            GmailApiError for a request that failed, so callers can tell a
+            deleted message (404) from an expired token or a transient error.
+        """
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for key, path in paths.items():
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <{key}>\r\n\r\n"
+                f"GET {path}\r\n\r\n"
+            )
+        body = "".join(parts) + f"--{boundary}--\r\n"
+
+        response = await self._http.post(
+            GMAIL_BATCH_PATH,
+            content=body.encode('utf-8'),
+            headers={**self._headers(), 'Content-Type': f"multipart/mixed; boundary={boundary}"}
+        )
+        if response.status_code >= 400:
+            raise GmailApiError(response.status_code, response.text)
+
+        return self._parse_batch_response(response.headers['Content-Type'], response.content)
+
+    async def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                       json_body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Send a single authenticated request to the Gmail API.
+
+        Args:
+            method: HTTP method.
+            path: Gmail API path.
+            params: Query parameters; None values are dropped.
+            json_body: JSON request body.
+
+        Returns:
+            Decoded JSON response.
+
+        Raises:
+            GmailApiError: If Gmail returns a non-2xx status.
+        """
+        query = {k: v for k, v in (params or {}).items() if v is not None}
+        response = await self._http.request(method, path, params=query, json=json_body, headers=self._headers())
+        if response.status_code >= 400:
+            raise GmailApiError(response.status_code, response.text)
+        return response.json() if response.content else {}
+
+    def _headers(self) -> Dict[str, str]:
+        """
+        Build the authorization headers for this mailbox.
+
+        Returns:
+            Header dictionary.
+        """
+        return {'Authorization': f"Bearer {self._access_token}"}
+
+    @staticmethod
+    def _parse_batch_response(content_type: str, content: bytes) -> Dict[str, Dict[str, Any]]:
+        """
+        Split a multipart/mixed batch response into per-request results.
+
+        Args:
+            content_type: Content-Type header of the batch response.
+            content: Raw response body.
+
+        Returns:
+            Dictionary mapping request key to decoded JSON body, or to a
+            GmailApiError if that request failed.
+        """
+        envelope = BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + content
+        )
+
+        results = {}
+        for part in envelope.get_payload():
+            key = part['Content-ID'].strip('<>')
+            if key.startswith('response-'):
+                key = key[len('response-'):]
+
+            # Each part is an HTTP response: status line, headers, blank line, body.
+            # Work on the original bytes: the str payload has non-ASCII characters mangled
+            raw = part.get_payload(decode=True)
+            if raw is None:
+                raw = part.get_payload()[0].as_bytes()
+            status_line, _, rest = raw.partition(b'\n')
+            _, _, body = rest.replace(b'\r\n', b'\n').partition(b'\n\n')
+            status = int(status_line.split()[1])
+            body = body.decode('utf-8')
+
+            if status >= 400:
+                results[key] = GmailApiError(status, body.strip()[:200])
+                continue
+            results[key] = json.loads(body) if body.strip() else {}
+
+        return results
@@ -0,0 +1,154 @@
+"""
+Gmail Service Cache module for the Mail AI Backend application.
+
+This module keeps authenticated Gmail clients per user and preloads Google API
+discovery documents, so that building a client is effectively free on the hot
+path. It follows the Single Responsibility Principle by handling only the
+lifetime of API client objects.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+
+class GmailServiceCache:
+    """
+    Bounded LRU cache of per-user API clients with credential-bound TTL.
+
+    Each entry expires shortly before the access token it was built with, so
+    a cached client is never handed out with a stale token.
+    """
+
+    def __init__(self, max_size: int = 1000, expiry_skew_seconds: int = 60, default_ttl_seconds: int = 300):
+        """
+        Initialize GmailServiceCache.
+
+        Args:
+            max_size: Maximum number of users kept in the cache.
+            expiry_skew_seconds: How long before token expiry an entry is dropped.
+            default_ttl_seconds: TTL used when the credentials carry no expiry.
+        """
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._max_size = max_size
+        self._expiry_skew = expiry_skew_seconds
+        self._default_ttl = default_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached client for a user if it is still valid.
+
+        Args:
+            key: Cache key, usually the user's email address.
+
+        Returns:
+            Cached client, or None on a miss or expired entry.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, client: Any, expiry: Optional[datetime] = None) -> None:
+        """
+        Store a client until shortly before its credentials expire.
+
+        Args:
+            key: Cache key, usually the user's email address.
+            client: Authenticated API client.
+            expiry: Credential expiry as a naive UTC datetime (google-auth style).
+        """
+        if expiry is not None:
+            ttl = (expiry - datetime.utcnow()).total_seconds() - self._expiry_skew
+        else:
+            ttl = self._default_ttl
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (client, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drop a user's cached client, e.g. after a 401 from Gmail.
+
+        Args:
+            key: Cache key, usually the user's email address.
+        """
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return cache size and hit/miss counters.
+
+        Returns:
+            Dictionary of cache statistics.
+        """
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Discovery documents parsed once per process instead of on every build()
+_DISCOVERY_DOCS: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+
+def _get_discovery_doc(api: str, version: str) -> Dict[str, Any]:
+    """
+    Return the parsed static discovery document for an API.
+
+    Args:
+        api: API name, e.g. 'gmail' or 'oauth2'.
+        version: API version, e.g. 'v1'.
+
+    Returns:
+        Parsed discovery document.
+    """
+    key = (api, version)
+    if key not in _DISCOVERY_DOCS:
+        doc = get_static_doc(api, version)
+        if doc is None:
+            raise ValueError(f"No static discovery document for {api} {version}")
+        _DISCOVERY_DOCS[key] = json.loads(doc)
+    return _DISCOVERY_DOCS[key]
+
+
+def build_service(api: str, version: str, credentials) -> Any:
+    """
+    Build a googleapiclient service from the preloaded discovery document.
+
+    Drop-in replacement for ``googleapiclient.discovery.build`` that skips
+    fetching and re-parsing the discovery document.
+
+    Args:
+        api: API name, e.g. 'gmail' or 'oauth2'.
+        version: API version, e.g. 'v1'.
+        credentials: Google credentials for the service.
+
+    Returns:
+        googleapiclient Resource for the API.
+    """
+    return build_from_document(_get_discovery_doc(api, version), credentials=credentials)
+
+
+def preload_discovery_docs(*apis: Tuple[str, str]) -> None:
+    """
+    Parse discovery documents at startup so the first request does not pay for it.
+
+    Args:
+        apis: (api, version) pairs to preload.
+    """
+    for api, version in apis:
+        _get_discovery_doc(api, version)
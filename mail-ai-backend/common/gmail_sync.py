@@ -0,0 +1,140 @@
+"""
+Gmail Sync module for the Mail AI Backend application.
+
+This module implements incremental mailbox synchronisation on top of the Gmail
+``users.history.list`` API. It follows the Single Responsibility Principle by
+focusing solely on working out which messages were added since the last sync.
+"""
+
+from typing import List, Dict, Optional, Tuple
+from common.gmail_client import AsyncGmailClient, GmailApiError
+
+
+class GmailSyncEngine:
+    """
+    History-driven sync engine for a single Gmail mailbox.
+
+    Starting from a stored history cursor, pages through ``history.list`` and
+    returns every message added since that cursor, oldest first, together
+    with the cursor to store for the next sync. An optional end cursor bounds
+    the range so that it matches what the caller has claimed.
+    """
+
+    def __init__(self, page_size: int = 500):
+        """
+        Initialize GmailSyncEngine.
+
+        Args:
+            page_size: Maximum number of history records requested per page.
+        """
+        self._page_size = page_size
+
+    async def sync(self, gmail_client: AsyncGmailClient, start_history_id: Optional[str],
+                   end_history_id: Optional[str] = None) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """
+        Collect all messages added to the mailbox since the stored cursor.
+
+        When there is no stored cursor yet (first notification for a user) or
+        the cursor is too old for Gmail to serve, falls back to the latest
+        message in the mailbox and restarts the cursor from ``end_history_id``.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            start_history_id: Stored history cursor for this mailbox, if any.
+            end_history_id: Last history ID to include, usually the one carried
+                by the Pub/Sub notification. Unbounded if None.
+
+        Returns:
+            Tuple of (messages, new_history_id) where messages is a list of
+            ``{'id', 'threadId'}`` dicts in the order they were added.
+        """
+        if not start_history_id:
+            return await self._latest_message(gmail_client), end_history_id
+
+        try:
+            return await self._list_history(gmail_client, start_history_id, end_history_id)
+        except GmailApiError as e:
+            # 404 means the cursor is older than Gmail's history retention
+            if e.status != 404:
+                raise
+            print(f"[Sync] History {start_history_id} expired, resyncing from latest message.")
+            return await self._latest_message(gmail_client), end_history_id
+
+    async def _list_history(self, gmail_client: AsyncGmailClient, start_history_id: str,
+                      end_history_id: Optional[str]) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """
+        Page through history records and collect added messages.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            start_history_id: History ID to start listing from.
+            end_history_id: Last history ID to include, or None for no bound.
+
+        Returns:
+            Tuple of (messages, new_history_id).
+        """
+        end = int(end_history_id) if end_history_id else None
+        messages = []
+        seen_ids = set()
+        latest_history_id = start_history_id
+        page_token = None
+        reached_end = False
+
+        while not reached_end:
+            response = await gmail_client.list_history(
+                start_history_id,
+                history_types=['messageAdded'],
+                max_results=self._page_size,
+                page_token=page_token
+            )
+
+            for record in response.get('history', []):
+                # Records are ordered by ID; later ones belong to the next sync
+                if end is not None and int(record['id']) > end:
+                    reached_end = True
+                    break
+                for added in record.get('messagesAdded', []):
+                    message = added['message']
+                    if message['id'] in seen_ids:
+                        continue
+                    seen_ids.add(message['id'])
+                    messages.append({'id': message['id'], 'threadId': message['threadId']})
+
+            latest_history_id = response.get('historyId', latest_history_id)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        if end is not None:
+            return messages, end_history_id
+        return messages, self._max_history_id(start_history_id, latest_history_id)
+
+    async def _latest_message(self, gmail_client: AsyncGmailClient) -> List[Dict[str, str]]:
+        """
+        Fetch the single latest message in the mailbox.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+
+        Returns:
+            List with zero or one ``{'id', 'threadId'}`` dict.
+        """
+        results = await gmail_client.list_messages(max_results=1)
+        return [
+            {'id': m['id'], 'threadId': m['threadId']}
+            for m in results.get('messages', [])
+        ]
+
+    @staticmethod
+    def _max_history_id(*history_ids: Optional[str]) -> Optional[str]:
+        """
+        Return the highest of the given history IDs.
+
+        Args:
+            history_ids: History IDs as strings (None values are ignored).
+
+        Returns:
+            The largest history ID, or None if none were given.
+        """
+        valid = [int(h) for h in history_ids if h]
+        return str(max(valid)) if valid else None
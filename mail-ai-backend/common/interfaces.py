@@ -31,6 +31,22 @@ class IUserRepository(ABC):
         """Update user's active status."""
         pass
 
+    @abstractmethod
+    async def claim_sync_range(self, email: str, start_history_id: Optional[str], end_history_id: str,
+                               owner: str, lease_seconds: int) -> bool:
+        """Take an expiring claim on syncing the mailbox from its current cursor."""
+        pass
+
+    @abstractmethod
+    async def commit_sync_cursor(self, email: str, owner: str, end_history_id: str) -> bool:
+        """Move the cursor to the claimed end and drop the claim, if the caller still holds it."""
+        pass
+
+    @abstractmethod
+    async def release_sync_claim(self, email: str, owner: str) -> None:
+        """Drop the caller's claim without moving the cursor."""
+        pass
+
 
 class IEmailRepository(ABC):
     """
@@ -49,8 +65,8 @@ class IEmailRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_thread_logs(self, thread_id: str, limit: int = 10) -> list:
-        """Retrieve logs for a specific thread."""
+    async def get_thread_logs(self, thread_id: str, limit: int = 10, latest: bool = False) -> list:
+        """Retrieve logs for a specific thread, oldest first (the newest `limit` if latest)."""
         pass
 
     @abstractmethod
@@ -59,6 +75,62 @@ class IEmailRepository(ABC):
         pass
 
 
+class ILeaseRepository(ABC):
+    """
+    Abstract interface for replica membership leases.
+
+    Defines methods for heartbeat-based membership of processor replicas.
+    """
+    @abstractmethod
+    async def renew_lease(self, member_id: str, ttl_seconds: int) -> None:
+        """Create or extend a member's lease."""
+        pass
+
+    @abstractmethod
+    async def get_live_members(self) -> List[str]:
+        """Retrieve IDs of members whose lease has not expired."""
+        pass
+
+    @abstractmethod
+    async def release_lease(self, member_id: str) -> None:
+        """Remove a member's lease."""
+        pass
+
+
+class ISummaryCacheRepository(ABC):
+    """
+    Abstract interface for the shared summary cache.
+
+    Defines methods for storing summaries keyed by a content hash.
+    """
+    @abstractmethod
+    async def get_summary(self, key: str) -> Optional[str]:
+        """Retrieve an unexpired cached summary."""
+        pass
+
+    @abstractmethod
+    async def save_summary(self, key: str, summary: str, ttl_seconds: int) -> None:
+        """Store a summary that expires after ttl_seconds."""
+        pass
+
+
+class IThreadDigestRepository(ABC):
+    """
+    Abstract interface for rolling per-thread digests.
+
+    Defines methods for reading and persisting a thread's compact digest.
+    """
+    @abstractmethod
+    async def get_digest(self, user_email: str, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the digest for a user's thread."""
+        pass
+
+    @abstractmethod
+    async def save_digest(self, digest: Dict[str, Any]) -> bool:
+        """Create or replace a thread digest unless it changed since it was read."""
+        pass
+
+
 class IAuthService(ABC):
     """
     Abstract interface for authentication services.
@@ -98,3 +170,8 @@ class IAIService(ABC):
     def summarize(self, text: str, prompt: str) -> str:
         """Generate summary of the given text."""
         pass
+
+    @abstractmethod
+    async def summarize_async(self, text: str, prompt: str) -> str:
+        """Generate summary of the given text without blocking the event loop."""
+        pass
@@ -0,0 +1,66 @@
+"""
+Lease Repository module for the Mail AI Backend application.
+
+This module implements the ILeaseRepository interface used for replica
+membership. It follows the Repository Pattern to abstract database operations
+and the Single Responsibility Principle by handling only lease data access.
+"""
+
+from typing import List
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from common.interfaces import ILeaseRepository
+
+
+class MongoLeaseRepository(ILeaseRepository):
+    """
+    MongoDB implementation of ILeaseRepository.
+
+    Each live replica keeps one document in the collection and renews its
+    ``expires_at`` on every heartbeat.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str = "processor_leases"):
+        """
+        Initialize MongoLeaseRepository with database connection.
+
+        Args:
+            db: MongoDB database instance.
+            collection_name: Name of the lease collection.
+        """
+        self._db = db
+        self._collection = db[collection_name]
+
+    async def renew_lease(self, member_id: str, ttl_seconds: int) -> None:
+        """
+        Create or extend a member's lease.
+
+        Args:
+            member_id: Replica identifier.
+            ttl_seconds: Seconds until the lease expires without renewal.
+        """
+        now = datetime.utcnow()
+        await self._collection.update_one(
+            {"_id": member_id},
+            {"$set": {"expires_at": now + timedelta(seconds=ttl_seconds), "renewed_at": now}},
+            upsert=True
+        )
+
+    async def get_live_members(self) -> List[str]:
+        """
+        Retrieve IDs of members whose lease has not expired.
+
+        Returns:
+            Sorted list of live member IDs.
+        """
+        cursor = self._collection.find({"expires_at": {"$gt": datetime.utcnow()}}, {"_id": 1})
+        return sorted(doc["_id"] async for doc in cursor)
+
+    async def release_lease(self, member_id: str) -> None:
+        """
+        Remove a member's lease, e.g. on graceful shutdown.
+
+        Args:
+            member_id: Replica identifier.
+        """
+        await self._collection.delete_one({"_id": member_id})
@@ -0,0 +1,109 @@
+"""
+Model Ladder module for the Mail AI Backend application.
+
+This module picks which model of a provider handles each summary. Every
+provider has a configured ladder of models ordered from fastest/cheapest to
+largest; a request climbs the ladder with its input size and Gmail's
+IMPORTANT label, and drops back down when the work queue is backed up so the
+service catches up on faster models. It follows the Single Responsibility
+Principle by handling only model selection; calls are made by AIFactory
+services.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+
+class ModelLadder:
+    """
+    Chooses a rung (size class) per request and maps it to a provider model.
+
+    The rung is the number of ``token_steps`` the input exceeds, plus one for
+    IMPORTANT mail, minus one for every ``backlog_queue_depth`` messages
+    waiting in the queue. Rung 0 is the first (fastest) model of a ladder and
+    rungs past the end use its last model, so ladders of different lengths
+    can be mixed across providers.
+    """
+
+    def __init__(self, ladders: Dict[str, List[str]], token_steps: Optional[List[int]] = None,
+                 backlog_queue_depth: int = 0, queue_depth: Optional[Callable[[], int]] = None):
+        """
+        Initialize ModelLadder.
+
+        Args:
+            ladders: Provider name -> model names, fastest first. Providers
+                without a ladder use their default model.
+            token_steps: Input token counts at which a request moves up a rung.
+            backlog_queue_depth: Queue depth per rung the selection drops
+                under backlog; 0 disables the backlog shift.
+            queue_depth: Callable returning the current queue depth.
+        """
+        self._ladders = {name: list(models) for name, models in ladders.items() if models}
+        self._token_steps = sorted(token_steps or [])
+        self._backlog_queue_depth = backlog_queue_depth
+        self.queue_depth = queue_depth
+        self.selections: Dict[str, int] = {}
+        self.backlog_downgrades = 0
+
+    def rung(self, input_tokens: int, important: bool = False) -> int:
+        """
+        Size class for one request.
+
+        Args:
+            input_tokens: Prompt size in tokens.
+            important: Whether Gmail marked the message IMPORTANT.
+
+        Returns:
+            Rung index, 0 being the fastest model.
+        """
+        rung = sum(1 for step in self._token_steps if input_tokens > step)
+        if important:
+            rung += 1
+
+        if self._backlog_queue_depth > 0 and self.queue_depth is not None and rung > 0:
+            drop = min(self.queue_depth() // self._backlog_queue_depth, rung)
+            if drop:
+                self.backlog_downgrades += 1
+                rung -= drop
+        return rung
+
+    def model_for(self, provider_name: str, rung: Optional[int]) -> Optional[str]:
+        """
+        Model of a provider's ladder for a rung.
+
+        Args:
+            provider_name: Provider name.
+            rung: Rung from rung(); None uses the provider default.
+
+        Returns:
+            Model name, or None for the provider's default model.
+        """
+        ladder = self._ladders.get(provider_name)
+        if not ladder or rung is None:
+            return None
+        return ladder[min(rung, len(ladder) - 1)]
+
+    def select(self, provider_name: str, input_tokens: int, important: bool = False) -> Optional[str]:
+        """
+        Pick the model for one request and count the choice.
+
+        Args:
+            provider_name: Provider name.
+            input_tokens: Prompt size in tokens.
+            important: Whether Gmail marked the message IMPORTANT.
+
+        Returns:
+            Model name, or None for the provider's default model.
+        """
+        model = self.model_for(provider_name, self.rung(input_tokens, important))
+        label = f"{provider_name}:{model or 'default'}"
+        self.selections[label] = self.selections.get(label, 0) + 1
+        return model
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Return how often each model was selected.
+
+        Returns:
+            Dictionary of selection counts and backlog downgrades.
+        """
+        return {"model_selections": dict(self.selections), "backlog_downgrades": self.backlog_downgrades}
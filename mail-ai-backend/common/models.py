@@ -5,12 +5,14 @@ from datetime import datetime
 class UserSettings(BaseModel):
     ai_provider: str = "gemini"
     context_depth: int = 10  # How many past emails to include?
+    allowed_providers: Optional[List[str]] = None  # Providers we may fail over to; None = any configured
 
 class User(BaseModel):
     email: str
     refresh_token: str
     settings: UserSettings = Field(default_factory=UserSettings)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_history_id: Optional[str] = None  # Gmail history cursor of the last completed sync
 
 class EmailLog(BaseModel):
     user_email: str
@@ -23,5 +25,8 @@ class EmailLog(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
     direction: str = "inbound"  # "inbound" or "outbound"
+    tier: str = "full"  # Triage tier: "skip", "template" or "full" (LLM summary)
+    ai_provider: Optional[str] = None
+    ai_model: Optional[str] = None  # Model that produced the summary, after any failover (None = no LLM call)
     # MongoDB Index Hint (Not code, but logical):
     # Create compound index: (thread_id, timestamp) for fast fetching
\ No newline at end of file
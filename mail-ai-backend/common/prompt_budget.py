@@ -0,0 +1,131 @@
+"""
+Prompt Budget module for the Mail AI Backend application.
+
+This module fits a summarization prompt into a token budget. The new email
+is reserved first and the remaining budget is filled with the newest context
+entries, so long thread history can never push the email itself out of the
+model's input. It follows the Single Responsibility Principle by handling
+only token counting and prompt sizing.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+NO_CONTEXT = "No previous conversation history."
+
+# Rough characters-per-token ratio for models without a local tokenizer (e.g. Gemini)
+_CHARS_PER_TOKEN = 4
+
+
+class PromptBudgeter:
+    """
+    Token-aware prompt sizing per provider model.
+
+    OpenAI models are counted with tiktoken when it is installed; other
+    models use a conservative character-based estimate.
+    """
+
+    def __init__(self, max_input_tokens: int = 3000):
+        """
+        Initialize PromptBudgeter.
+
+        Args:
+            max_input_tokens: Token budget for the whole prompt.
+        """
+        self.max_input_tokens = max_input_tokens
+        self._encodings: Dict[str, Optional[object]] = {}
+
+    def count_tokens(self, text: str, model: str = "") -> int:
+        """
+        Count tokens in text for the given model.
+
+        Args:
+            text: Text to measure.
+            model: Provider model name.
+
+        Returns:
+            Token count (estimated when no tokenizer is available).
+        """
+        encoding = self._get_encoding(model)
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+    def fit(self, template: str, email_content: str, context_entries: List[str],
+            model: str = "") -> Tuple[str, str]:
+        """
+        Size the email and context so the filled template fits the budget.
+
+        Args:
+            template: Prompt template with {context} and {email_content} placeholders.
+            email_content: The new email; always kept, truncated only if it
+                alone exceeds the budget.
+            context_entries: Context entries, oldest first.
+            model: Provider model name used for counting.
+
+        Returns:
+            Tuple of (email_content, context_str) to substitute into the template.
+        """
+        overhead = self.count_tokens(template.replace("{context}", "").replace("{email_content}", ""), model)
+        remaining = max(self.max_input_tokens - overhead, 0)
+
+        email_content = self.truncate(email_content, remaining, model)
+        remaining -= self.count_tokens(email_content, model)
+
+        # Newest entries are the most relevant, so fill from the end
+        kept: List[str] = []
+        for entry in reversed(context_entries):
+            cost = self.count_tokens(entry, model) + 1  # +1 for the joining newline
+            if cost > remaining:
+                break
+            kept.append(entry)
+            remaining -= cost
+
+        context_str = "\n".join(reversed(kept)) if kept else NO_CONTEXT
+        return email_content, context_str
+
+    def truncate(self, text: str, max_tokens: int, model: str = "") -> str:
+        """
+        Cut text down to at most max_tokens tokens.
+
+        Args:
+            text: Text to truncate.
+            max_tokens: Token limit.
+            model: Provider model name.
+
+        Returns:
+            The original text if it fits, otherwise its longest fitting prefix.
+        """
+        if self.count_tokens(text, model) <= max_tokens:
+            return text
+
+        encoding = self._get_encoding(model)
+        if encoding is not None:
+            return encoding.decode(encoding.encode(text)[:max_tokens])
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+
+    def _get_encoding(self, model: str):
+        """
+        Return a cached tiktoken encoding for OpenAI models, or None.
+
+        Args:
+            model: Provider model name.
+
+        Returns:
+            tiktoken Encoding, or None when unavailable for this model.
+        """
+        if model in self._encodings:
+            return self._encodings[model]
+
+        encoding = None
+        if model.startswith(("gpt-", "o1", "o3", "o4")):
+            try:
+                import tiktoken
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+            except ImportError:
+                pass  # Optional dependency; fall back to the estimate
+
+        self._encodings[model] = encoding
+        return encoding
@@ -0,0 +1,190 @@
+"""
+Rate Limiter module for the Mail AI Backend application.
+
+This module provides token-bucket admission control for AI provider calls.
+Each provider API key gets one limiter enforcing both requests per minute and
+tokens per minute; callers that exceed the quota wait in FIFO order instead
+of being rejected with 429s. It follows the Single Responsibility Principle
+by handling only admission control.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Dict, Tuple
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to ``capacity`` units, refilled continuously.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        Initialize TokenBucket, starting full.
+
+        Args:
+            capacity: Maximum units held (the burst size).
+            refill_per_second: Units added per second.
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._level = capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until ``amount`` units are available (0 if available now).
+
+        Args:
+            amount: Units needed; clamped to capacity so oversized requests still pass.
+
+        Returns:
+            Seconds to wait.
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self._level
+        return max(missing / self.refill_per_second, 0.0)
+
+    def consume(self, amount: float) -> None:
+        """
+        Remove units from the bucket.
+
+        Args:
+            amount: Units to take.
+        """
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Requests/min and tokens/min limiter with a fair (FIFO) wait queue.
+
+    Only the request at the head of the queue waits for capacity; everyone
+    else waits behind it, so a large request cannot be starved by a stream
+    of small ones. A limit of 0 disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Initialize RateLimiter.
+
+        Args:
+            requests_per_minute: Request quota (0 for unlimited).
+            tokens_per_minute: Token quota (0 for unlimited).
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute > 0 else None
+        # asyncio.Lock wakes waiters in arrival order. Created on first use inside the running
+        # loop: limiters are shared module-wide and may be built before (or outside) that loop
+        self._queue = None
+        self._queue_loop = None
+        self.admitted = 0
+        self.throttled = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """
+        Wait until one request of ``tokens`` tokens fits the quota, then admit it.
+
+        Args:
+            tokens: Estimated tokens the call will use.
+
+        Returns:
+            Seconds spent waiting for admission.
+        """
+        if self._requests is None and self._tokens is None:
+            self.admitted += 1
+            return 0.0
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._get_queue():
+                while True:
+                    delay = max(
+                        self._requests.wait_time(1) if self._requests else 0.0,
+                        self._tokens.wait_time(tokens) if self._tokens else 0.0,
+                    )
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+
+                if self._requests:
+                    self._requests.consume(1)
+                if self._tokens:
+                    self._tokens.consume(tokens)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > 0.001:
+            self.throttled += 1
+        return waited
+
+    def _get_queue(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._queue_loop is not loop:
+            self._queue, self._queue_loop = asyncio.Lock(), loop
+        return self._queue
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return admission counters and measured wait times.
+
+        Returns:
+            Dictionary of limiter statistics.
+        """
+        return {
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "waiting": self.waiting,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider_name: str, api_key: str, requests_per_minute: int,
+                     tokens_per_minute: int) -> RateLimiter:
+    """
+    Return the shared limiter for a provider API key, creating it if needed.
+
+    Quotas are enforced per key, so services sharing a key share a limiter.
+    If the limits differ from those of the existing limiter (e.g. after
+    AIFactory.reload() with a changed quota), the limiter is replaced;
+    unchanged limits keep the existing one and its consumed quota.
+
+    Args:
+        provider_name: Provider name, e.g. 'gemini'.
+        api_key: Provider API key (only its hash is kept).
+        requests_per_minute: Request quota (0 for unlimited).
+        tokens_per_minute: Token quota (0 for unlimited).
+
+    Returns:
+        RateLimiter instance.
+    """
+    key = (provider_name, hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16])
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None or (limiter.requests_per_minute, limiter.tokens_per_minute) != (
+                requests_per_minute, tokens_per_minute):
+            limiter = _limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return limiter
@@ -0,0 +1,78 @@
+"""
+Single Flight module for the Mail AI Backend application.
+
+This module collapses concurrent executions of the same keyed operation into
+one: the first caller runs it and every caller that arrives while it is in
+flight awaits the same result. Under notification storms this keeps a message
+from being summarized (and billed) more than once. It follows the Single
+Responsibility Principle by handling only in-process call deduplication.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    In-process single-flight map keyed by an arbitrary hashable key.
+
+    Keys are only held while the call is in flight; once it completes, the
+    next caller with the same key runs the operation again.
+    """
+
+    def __init__(self):
+        """
+        Initialize SingleFlight.
+        """
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.suppressed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` unless a call with the same key is already in flight.
+
+        Args:
+            key: Deduplication key, e.g. (user_email, message_id).
+            fn: Async callable producing the result.
+
+        Returns:
+            Tuple of (result, shared); shared is True for callers that awaited
+            another caller's execution instead of running ``fn``.
+
+        Raises:
+            Exception: Whatever ``fn`` raised, for the leader and every waiter.
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.suppressed += 1
+            # Shield so a cancelled waiter does not cancel the leader's result
+            return await asyncio.shield(future), True
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody waited on is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return call statistics.
+
+        Returns:
+            Dictionary with executed calls, suppressed duplicates and in-flight keys.
+        """
+        return {"calls": self.calls, "suppressed": self.suppressed, "in_flight": len(self._in_flight)}
@@ -0,0 +1,327 @@
+"""
+Summary Batcher module for the Mail AI Backend application.
+
+This module packs several independent summarization requests for the same
+provider into one structured LLM request and splits the structured response
+back into per-email summaries. Requests whose content was already summarized
+are answered from an optional SummaryCache without reaching the provider, and
+an optional AIRouter picks the provider and fails over when one is unhealthy.
+A model chosen from the provider's ladder is kept for that provider; failover
+to another provider uses that provider's default model, and every summary is
+returned with the provider and model that actually produced it.
+"""
+
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+from common.ai_factory import AIFactory
+from common.ai_router import AIRouter
+from common.summary_cache import SummaryCache
+
+BATCH_SYSTEM_PROMPT = (
+    "You will receive several independent emails, each with its own instructions. "
+    "Handle every email separately and never mix information between them. "
+    'Respond only with JSON of the form {"summaries": [{"id": <email id>, "summary": "<text>"}]} '
+    "containing exactly one entry per email."
+)
+
+
+class _PendingSummary:
+    """
+    One queued summarization request and the future its caller awaits.
+    """
+
+    def __init__(self, text: str, prompt: str, future: asyncio.Future,
+                 allowed_providers: Optional[List[str]] = None):
+        self.text = text
+        self.prompt = prompt
+        self.future = future
+        self.allowed_providers = allowed_providers
+
+
+class SummaryBatcher:
+    """
+    Micro-batcher in front of AIFactory providers.
+
+    Requests for the same user, provider and model are collected until either
+    ``max_batch_size`` requests are waiting or ``max_wait_seconds`` has passed
+    since the first one, then sent as a single request. A lone request is sent
+    as a normal summarize call, and any email the batched response does not
+    cover falls back to an individual call. Emails of different users never
+    share a request, so one user's mail cannot steer a summary of another's.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_wait_seconds: float = 0.3,
+                 cache: Optional[SummaryCache] = None, router: Optional[AIRouter] = None):
+        """
+        Initialize SummaryBatcher.
+
+        Args:
+            max_batch_size: Maximum number of emails per LLM request.
+            max_wait_seconds: Longest time a request waits for companions.
+            cache: Content-addressed summary cache checked before any request.
+            router: Health-aware provider router; None always uses the
+                requested provider.
+        """
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_seconds
+        self._cache = cache
+        self._router = router
+        self._batches: Dict[tuple, List[_PendingSummary]] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+        self.requests = 0
+        self.llm_calls = 0
+
+    async def summarize(self, user_email: str, provider_name: str, text: str, prompt: str,
+                        allowed_providers: Optional[List[str]] = None,
+                        model_name: Optional[str] = None) -> Tuple[str, str, str]:
+        """
+        Summarize one email, possibly as part of a larger batched request.
+
+        Args:
+            user_email: Mailbox owner; only this user's emails share a batch.
+            provider_name: Preferred AI provider ('gemini', 'openai', etc.).
+            text: Email content (already combined with any context).
+            prompt: Instructions for this email.
+            allowed_providers: Providers the user permits for failover;
+                None allows every configured provider.
+            model_name: Model of the preferred provider's ladder; None uses
+                the provider default.
+
+        Returns:
+            Tuple of (AI-generated summary, provider used, model used); after
+            failover these name the provider that answered, not the preferred one.
+        """
+        if self._router is not None:
+            # Batch on the provider the router would try first right now
+            routed = next(iter(self._router.candidates(provider_name, allowed_providers)), provider_name)
+            if routed != provider_name:
+                provider_name, model_name = routed, None
+        key = (user_email, provider_name, model_name)
+        self.requests += 1
+
+        cache_key = None
+        if self._cache is not None:
+            model = self._model_of(provider_name, model_name)
+            cache_key = SummaryCache.make_key(f"{provider_name}:{model}", prompt, text)
+            cached = await self._cache.get(cache_key)
+            if cached is not None:
+                return cached, provider_name, model
+
+        summary, used_provider, used_model = await self._request(key, text, prompt, allowed_providers)
+        if cache_key is not None and used_provider == provider_name:
+            # A failover answer belongs to another provider's cache key
+            await self._cache.put(cache_key, summary)
+        return summary, used_provider, used_model
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return counters of summaries requested vs. LLM calls made.
+
+        Returns:
+            Dictionary of batching and cache statistics.
+        """
+        stats = {"summary_requests": self.requests, "llm_calls": self.llm_calls}
+        if self._cache is not None:
+            stats.update(self._cache.stats())
+        if self._router is not None:
+            stats["routing"] = self._router.stats()
+        return stats
+
+    async def _request(self, key: tuple, text: str, prompt: str,
+                       allowed_providers: Optional[List[str]]) -> Tuple[str, str, str]:
+        """
+        Queue a request into its provider's batch and wait for its summary.
+
+        Args:
+            key: (user_email, provider_name, model_name) batch key; None model is the default.
+            text: Email content.
+            prompt: Instructions for this email.
+            allowed_providers: Providers the user permits for failover.
+
+        Returns:
+            Tuple of (AI-generated summary, provider used, model used).
+        """
+        if self._max_batch_size <= 1:
+            return await self._summarize_one(key, text, prompt, allowed_providers)
+
+        loop = asyncio.get_running_loop()
+        pending = _PendingSummary(text, prompt, loop.create_future(), allowed_providers)
+
+        batch = self._batches.setdefault(key, [])
+        batch.append(pending)
+        if len(batch) >= self._max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self._max_wait, self._flush, key)
+
+        return await asyncio.shield(pending.future)
+
+    def _flush(self, key: tuple) -> None:
+        """
+        Take the waiting batch for a provider and send it in the background.
+
+        Args:
+            key: (user_email, provider_name, model_name) batch key; None model is the default.
+        """
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        batch = self._batches.pop(key, [])
+        if batch:
+            asyncio.ensure_future(self._send(key, batch))
+
+    async def _send(self, key: tuple, batch: List[_PendingSummary]) -> None:
+        """
+        Send a batch and resolve each caller's future with its own summary.
+
+        Args:
+            key: (user_email, provider_name, model_name) chosen for the batch.
+            batch: Requests to summarize.
+        """
+        _, provider_name, model_name = key
+        summaries: Dict[int, str] = {}
+        batch_model = None
+        if len(batch) > 1:
+            self.llm_calls += 1
+
+            def attempt(name: str):
+                # Routed calls were admitted by the router, outside the timed span
+                return AIFactory.get_service(name, model_name).generate_async(
+                    prompt, system=BATCH_SYSTEM_PROMPT, json_mode=True, admitted=self._router is not None
+                )
+
+            def admit(name: str):
+                return AIFactory.get_service(name, model_name).admit(prompt, system=BATCH_SYSTEM_PROMPT)
+
+            try:
+                prompt = self._build_batch_prompt(batch)
+                if self._router is not None:
+                    # No failover for the batch itself; its emails fail over individually
+                    _, response = await self._router.call(provider_name, [provider_name], attempt, admit)
+                else:
+                    response = await attempt(provider_name)
+                summaries = self._parse_batch_response(response)
+                batch_model = self._model_of(provider_name, model_name)
+            except Exception as e:
+                print(f"[Summary Batcher Error]: Batch of {len(batch)} failed, sending individually: {e}")
+
+        async def _resolve(index: int, pending: _PendingSummary) -> None:
+            try:
+                summary = summaries.get(index)
+                if summary is None:
+                    result = await self._summarize_one(key, pending.text, pending.prompt, pending.allowed_providers)
+                else:
+                    result = (summary, provider_name, batch_model)
+            except Exception as e:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+                return
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+        try:
+            await asyncio.gather(*(_resolve(i, p) for i, p in enumerate(batch)))
+        finally:
+            # Never leave a caller waiting, even if this task itself was cancelled
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Summary batch was cancelled"))
+
+    async def _summarize_one(self, key: tuple, text: str, prompt: str,
+                             allowed_providers: Optional[List[str]]) -> Tuple[str, str, str]:
+        """
+        Summarize a single email, failing over between providers when routed.
+
+        Args:
+            key: (user_email, provider_name, model_name) of the preferred provider.
+            text: Email content.
+            prompt: Instructions for this email.
+            allowed_providers: Providers the user permits for failover.
+
+        Returns:
+            Tuple of (AI-generated summary, provider used, model used); the
+            summary is an error string if every provider failed.
+        """
+        _, provider_name, model_name = key
+        self.llm_calls += 1
+        if self._router is None:
+            summary = await AIFactory.get_service(provider_name, model_name).summarize_async(text, prompt)
+            return summary, provider_name, self._model_of(provider_name, model_name)
+
+        def service_for(name: str):
+            # Failover providers run their default model
+            return AIFactory.get_service(name, model_name if name == provider_name else None)
+
+        def attempt(name: str):
+            return service_for(name).generate_async(text, system=prompt, admitted=True)
+
+        def admit(name: str):
+            return service_for(name).admit(text, system=prompt)
+
+        try:
+            used, summary = await self._router.call(provider_name, allowed_providers, attempt, admit)
+        except Exception as e:
+            return f"[AI Error]: {str(e)}", provider_name, self._model_of(provider_name, model_name)
+        return summary, used, self._model_of(used, model_name if used == provider_name else None)
+
+    @staticmethod
+    def _model_of(provider_name: str, model_name: Optional[str]) -> str:
+        """
+        Resolve the model a provider's service actually runs.
+
+        Args:
+            provider_name: AI provider name.
+            model_name: Ladder model, or None for the provider default.
+
+        Returns:
+            Model name reported by the provider's service.
+        """
+        return getattr(AIFactory.get_service(provider_name, model_name), "model_name", model_name or "")
+
+    @staticmethod
+    def _build_batch_prompt(batch: List[_PendingSummary]) -> str:
+        """
+        Lay out every email with its own instructions under a numeric ID.
+
+        Args:
+            batch: Requests to include.
+
+        Returns:
+            Combined prompt text.
+        """
+        sections = [
+            f"### EMAIL id={i}\nINSTRUCTIONS:\n{p.prompt}\n\nCONTENT:\n{p.text}"
+            for i, p in enumerate(batch)
+        ]
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _parse_batch_response(response: str) -> Dict[int, str]:
+        """
+        Extract per-email summaries from the model's JSON answer.
+
+        Args:
+            response: Raw model output.
+
+        Returns:
+            Dictionary mapping email ID to summary; empty if unparseable.
+        """
+        # Models occasionally wrap JSON in markdown fences despite JSON mode
+        cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", response.strip())
+        try:
+            data = json.loads(cleaned)
+        except ValueError:
+            return {}
+
+        entries: Optional[list] = data.get("summaries") if isinstance(data, dict) else data
+        summaries = {}
+        for entry in entries or []:
+            try:
+                summary = str(entry["summary"]).strip()
+                if summary:
+                    summaries[int(entry["id"])] = summary
+            except (KeyError, TypeError, ValueError):
+                continue
+        return summaries
@@ -0,0 +1,142 @@
+"""
+Summary Cache module for the Mail AI Backend application.
+
+This module caches generated summaries under a hash of everything that
+determines them (model, instructions, normalized content), so identical bulk
+mail delivered to many users is summarized once. It follows the Single
+Responsibility Principle by handling only cache lookups and storage.
+"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from common.ai_factory import is_error_summary
+from common.interfaces import ISummaryCacheRepository
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class SummaryCache:
+    """
+    Two-level summary cache: an in-process LRU in front of a shared store.
+
+    Entries expire after ``ttl_seconds`` in both levels. Store failures are
+    logged and treated as misses so the cache never blocks summarization.
+    """
+
+    def __init__(self, repository: Optional[ISummaryCacheRepository] = None,
+                 max_size: int = 10000, ttl_seconds: int = 7 * 24 * 3600):
+        """
+        Initialize SummaryCache.
+
+        Args:
+            repository: Shared store; None keeps the cache process-local.
+            max_size: Maximum number of entries kept in memory.
+            ttl_seconds: Lifetime of a cached summary.
+        """
+        self._repository = repository
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, content: str) -> str:
+        """
+        Build the content-addressed key for a summarization request.
+
+        Args:
+            model: Provider and model identifier.
+            prompt: Instructions sent with the content.
+            content: Email text, including any thread context.
+
+        Returns:
+            Hex SHA-256 digest.
+        """
+        normalized = _WHITESPACE.sub(" ", content).strip()
+        return hashlib.sha256("\x00".join((model, prompt, normalized)).encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a summary, checking memory first and then the shared store.
+
+        Args:
+            key: Key from make_key().
+
+        Returns:
+            Cached summary, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            summary, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return summary
+            del self._entries[key]
+
+        summary = None
+        if self._repository is not None:
+            try:
+                summary = await self._repository.get_summary(key)
+            except Exception as e:
+                print(f"[Summary Cache Error]: Lookup failed: {e}")
+
+        if summary is None:
+            self.misses += 1
+            return None
+
+        self.store_hits += 1
+        self._remember(key, summary)
+        return summary
+
+    async def put(self, key: str, summary: str) -> None:
+        """
+        Store a summary unless it is a provider error message.
+
+        Args:
+            key: Key from make_key().
+            summary: Generated summary.
+        """
+        if not summary or is_error_summary(summary):
+            return
+
+        self._remember(key, summary)
+        if self._repository is not None:
+            try:
+                await self._repository.save_summary(key, summary, self._ttl)
+            except Exception as e:
+                print(f"[Summary Cache Error]: Save failed: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters and the overall hit rate.
+
+        Returns:
+            Dictionary of cache statistics.
+        """
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            "cache_memory_hits": self.memory_hits,
+            "cache_store_hits": self.store_hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round((self.memory_hits + self.store_hits) / lookups, 3) if lookups else 0.0,
+            "cache_size": len(self._entries),
+        }
+
+    def _remember(self, key: str, summary: str) -> None:
+        """
+        Insert into the in-process LRU, evicting the oldest entry when full.
+
+        Args:
+            key: Cache key.
+            summary: Summary to keep.
+        """
+        self._entries[key] = (summary, time.monotonic() + self._ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
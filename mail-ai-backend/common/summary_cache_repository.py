@@ -0,0 +1,71 @@
+"""
+Summary Cache Repository module for the Mail AI Backend application.
+
+This module implements the ISummaryCacheRepository interface backing the
+shared summary cache. It follows the Repository Pattern to abstract database
+operations and the Single Responsibility Principle by handling only cached
+summary data access.
+"""
+
+from typing import Optional
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from common.interfaces import ISummaryCacheRepository
+
+
+class MongoSummaryCacheRepository(ISummaryCacheRepository):
+    """
+    MongoDB implementation of ISummaryCacheRepository.
+
+    Each document is keyed by the content hash and carries an ``expires_at``
+    timestamp, which a TTL index uses to purge stale entries.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str = "summary_cache"):
+        """
+        Initialize MongoSummaryCacheRepository with database connection.
+
+        Args:
+            db: MongoDB database instance.
+            collection_name: Name of the cache collection.
+        """
+        self._db = db
+        self._collection = db[collection_name]
+
+    async def ensure_indexes(self) -> None:
+        """
+        Create the TTL index that removes expired summaries.
+        """
+        await self._collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get_summary(self, key: str) -> Optional[str]:
+        """
+        Retrieve an unexpired cached summary.
+
+        Args:
+            key: Content hash of the summarization request.
+
+        Returns:
+            Cached summary, or None if absent or expired.
+        """
+        # The TTL monitor only runs once a minute, so filter on expiry as well
+        doc = await self._collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"summary": 1}
+        )
+        return doc["summary"] if doc else None
+
+    async def save_summary(self, key: str, summary: str, ttl_seconds: int) -> None:
+        """
+        Store a summary that expires after ttl_seconds.
+
+        Args:
+            key: Content hash of the summarization request.
+            summary: Generated summary.
+            ttl_seconds: Seconds until the entry expires.
+        """
+        now = datetime.utcnow()
+        await self._collection.update_one(
+            {"_id": key},
+            {"$set": {"summary": summary, "created_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
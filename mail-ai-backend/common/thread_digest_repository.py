@@ -0,0 +1,76 @@
+"""
+Thread Digest Repository module for the Mail AI Backend application.
+
+This module implements the IThreadDigestRepository interface for the rolling
+per-thread digests used as prompt context. It follows the Repository Pattern
+to abstract database operations and the Single Responsibility Principle by
+handling only digest data access.
+"""
+
+from typing import Dict, Any, Optional
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+from common.interfaces import IThreadDigestRepository
+
+
+class MongoThreadDigestRepository(IThreadDigestRepository):
+    """
+    MongoDB implementation of IThreadDigestRepository.
+
+    One document per (user, thread), keyed by ``"<user_email>:<thread_id>"``.
+    Each write bumps a ``version`` field and only succeeds against the version
+    that was read, so concurrent updates of one thread cannot overwrite each
+    other.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str = "thread_digests"):
+        """
+        Initialize MongoThreadDigestRepository with database connection.
+
+        Args:
+            db: MongoDB database instance.
+            collection_name: Name of the digest collection.
+        """
+        self._db = db
+        self._collection = db[collection_name]
+
+    async def get_digest(self, user_email: str, thread_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the digest for a user's thread.
+
+        Args:
+            user_email: Mailbox owner.
+            thread_id: Gmail thread ID.
+
+        Returns:
+            Digest document, or None if the thread has none yet.
+        """
+        return await self._collection.find_one({"_id": f"{user_email}:{thread_id}"})
+
+    async def save_digest(self, digest: Dict[str, Any]) -> bool:
+        """
+        Create or replace a thread digest unless it changed since it was read.
+
+        Args:
+            digest: Digest document including ``user_email`` and ``thread_id``;
+                its ``version`` is the one read (absent for a new digest).
+
+        Returns:
+            True if saved; False if another writer got there first, in which
+            case the caller should re-read the digest and retry.
+        """
+        digest["_id"] = f"{digest['user_email']}:{digest['thread_id']}"
+        expected = digest.get("version")
+        # Digests written before versioning have no version field and are matched the same way
+        query = {"_id": digest["_id"], "version": expected if expected else {"$exists": False}}
+        document = {**digest, "version": (expected or 0) + 1, "updated_at": datetime.utcnow()}
+        try:
+            result = await self._collection.replace_one(query, document, upsert=True)
+        except DuplicateKeyError:
+            # The upsert found the document already there under another version
+            return False
+        if not result.matched_count and result.upserted_id is None:
+            return False
+        digest.update(version=document["version"], updated_at=document["updated_at"])
+        return True
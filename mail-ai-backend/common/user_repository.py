@@ -7,7 +7,7 @@ the Single Responsibility Principle by handling only data access concerns.
 """
 
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from common.interfaces import IUserRepository
 
@@ -71,3 +71,70 @@ class MongoUserRepository(IUserRepository):
             {"email": email},
             {"$set": update_data}
         )
+
+    async def claim_sync_range(self, email: str, start_history_id: Optional[str], end_history_id: str,
+                               owner: str, lease_seconds: int) -> bool:
+        """
+        Atomically claim the history range after the user's sync cursor.
+
+        The claim only succeeds if ``last_history_id`` still equals
+        ``start_history_id`` and no other unexpired claim exists. The cursor
+        itself is left alone until commit_sync_cursor(), so a worker that
+        fails or dies never moves it past unsynced history; a dead worker's
+        claim simply expires after ``lease_seconds``.
+
+        Args:
+            email: User's email address.
+            start_history_id: Cursor value read by the caller (None if unset).
+            end_history_id: History ID the caller will sync up to.
+            owner: Unique ID of this claim.
+            lease_seconds: How long the claim blocks other workers.
+
+        Returns:
+            True if this caller now holds the claim.
+        """
+        now = datetime.utcnow()
+        result = await self._collection.find_one_and_update(
+            {
+                "email": email,
+                "last_history_id": start_history_id,
+                "$or": [{"sync_claim": None}, {"sync_claim.expires_at": {"$lte": now}}]
+            },
+            {"$set": {"sync_claim": {
+                "owner": owner,
+                "end_history_id": end_history_id,
+                "expires_at": now + timedelta(seconds=lease_seconds)
+            }}}
+        )
+        return result is not None
+
+    async def commit_sync_cursor(self, email: str, owner: str, end_history_id: str) -> bool:
+        """
+        Advance the sync cursor after a successful sync and drop the claim.
+
+        Args:
+            email: User's email address.
+            owner: Claim ID passed to claim_sync_range().
+            end_history_id: History ID the sync covered.
+
+        Returns:
+            False if the claim had expired and been taken over by another worker.
+        """
+        result = await self._collection.update_one(
+            {"email": email, "sync_claim.owner": owner},
+            {"$set": {"last_history_id": end_history_id}, "$unset": {"sync_claim": ""}}
+        )
+        return result.modified_count > 0
+
+    async def release_sync_claim(self, email: str, owner: str) -> None:
+        """
+        Drop a claim without moving the cursor, e.g. after a failed sync.
+
+        Args:
+            email: User's email address.
+            owner: Claim ID passed to claim_sync_range().
+        """
+        await self._collection.update_one(
+            {"email": email, "sync_claim.owner": owner},
+            {"$unset": {"sync_claim": ""}}
+        )
@@ -0,0 +1,272 @@
+"""
+Vector Index module for the Mail AI Backend application.
+
+This module provides offline, CPU-only relevance retrieval over stored email
+summaries. Summaries are embedded with a signed hashing vectorizer and kept
+in a per-user NumPy matrix memory-mapped from disk, so the most relevant past
+summaries across all of a user's threads and senders can be found without an
+external embedding service. It follows the Single Responsibility Principle by
+handling only vector storage and similarity search.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9'_-]+")
+_STOP_WORDS = frozenset(
+    "the a an and or but of to in on for with at by from is are was were be been it this that "
+    "as you your we our they their he she his her i me my re fwd please thanks hi hello".split()
+)
+
+
+class HashingVectorizer:
+    """
+    Stateless text embedder using the hashing trick.
+
+    Unigrams and bigrams are hashed into ``dim`` buckets with a hash-derived
+    sign, then L2-normalised, so cosine similarity is a plain dot product.
+    """
+
+    def __init__(self, dim: int = 1024):
+        """
+        Initialize HashingVectorizer.
+
+        Args:
+            dim: Embedding dimension.
+        """
+        self.dim = dim
+
+    def transform(self, text: str) -> np.ndarray:
+        """
+        Embed a text.
+
+        Args:
+            text: Input text.
+
+        Returns:
+            float32 vector of length ``dim`` with unit norm (or all zeros).
+        """
+        words = [w for w in _TOKEN.findall(text.lower()) if w not in _STOP_WORDS]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+            vector[digest % self.dim] += 1.0 if (digest >> 63) & 1 else -1.0
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+class UserVectorIndex:
+    """
+    One user's summaries: a memory-mapped float32 matrix plus row metadata.
+
+    Vectors live in ``<name>.vec`` and metadata in an append-only
+    ``<name>.meta.jsonl``; the matrix doubles its capacity when full.
+    """
+
+    def __init__(self, base_path: str, dim: int, initial_capacity: int = 256):
+        """
+        Open (or create) a user's index files.
+
+        Args:
+            base_path: Path prefix for the index files.
+            dim: Embedding dimension.
+            initial_capacity: Rows allocated for a new index.
+        """
+        self._vec_path = f"{base_path}.vec"
+        self._meta_path = f"{base_path}.meta.jsonl"
+        self._dim = dim
+        self._lock = threading.Lock()
+
+        self._meta: List[Dict[str, Any]] = []
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._meta = [json.loads(line) for line in f if line.strip()]
+        self._ids = {m["message_id"] for m in self._meta}
+        self._initial_capacity = initial_capacity
+        self._vectors: Optional[np.memmap] = None
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def add(self, vector: np.ndarray, meta: Dict[str, Any]) -> bool:
+        """
+        Append one summary.
+
+        Args:
+            vector: Embedding from HashingVectorizer.
+            meta: Row metadata; must include ``message_id``.
+
+        Returns:
+            False if the message was already indexed.
+        """
+        with self._lock:
+            if meta["message_id"] in self._ids:
+                return False
+            self._open()
+            if len(self._meta) >= self._vectors.shape[0]:
+                self._grow()
+
+            # Vector first, then metadata: a crash can only leave an unused trailing row
+            self._vectors[len(self._meta)] = vector
+            self._vectors.flush()
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(meta, default=str) + "\n")
+            self._meta.append(meta)
+            self._ids.add(meta["message_id"])
+            return True
+
+    def search(self, query: np.ndarray, k: int, exclude_thread_id: Optional[str] = None,
+               min_score: float = 0.1) -> List[Dict[str, Any]]:
+        """
+        Return the ``k`` most similar summaries.
+
+        Args:
+            query: Query embedding.
+            k: Maximum results.
+            exclude_thread_id: Skip rows from this thread (already in context).
+            min_score: Minimum cosine similarity to return.
+
+        Returns:
+            Metadata dictionaries with a ``score`` key, best first.
+        """
+        with self._lock:
+            count = len(self._meta)
+            if count == 0 or k <= 0:
+                return []
+            self._open()
+            scores = np.asarray(self._vectors[:count] @ query)
+
+            # Over-fetch so excluded rows do not starve the result
+            top = min(count, k * 4)
+            candidates = np.argpartition(-scores, top - 1)[:top]
+            results = []
+            for row in candidates[np.argsort(-scores[candidates])]:
+                meta = self._meta[row]
+                if scores[row] < min_score:
+                    break
+                if exclude_thread_id and meta.get("thread_id") == exclude_thread_id:
+                    continue
+                results.append(dict(meta, score=float(scores[row])))
+                if len(results) >= k:
+                    break
+            return results
+
+    def close(self) -> None:
+        """
+        Flush and release the memory map.
+
+        A closed index reopens itself on the next add or search, so a thread
+        still holding it after LRU eviction keeps working.
+        """
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+
+    def _open(self) -> None:
+        # Caller holds _lock (or is the constructor)
+        if self._vectors is not None:
+            return
+        if os.path.exists(self._vec_path):
+            capacity = os.path.getsize(self._vec_path) // (self._dim * 4)
+            self._vectors = np.memmap(self._vec_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+        else:
+            self._vectors = np.memmap(
+                self._vec_path, dtype=np.float32, mode="w+", shape=(self._initial_capacity, self._dim)
+            )
+
+    def _grow(self) -> None:
+        capacity = self._vectors.shape[0] * 2
+        tmp_path = f"{self._vec_path}.tmp"
+        grown = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self._dim))
+        grown[:self._vectors.shape[0]] = self._vectors
+        grown.flush()
+        del grown
+        self._vectors.flush()
+        self._vectors = None
+        os.replace(tmp_path, self._vec_path)
+        self._vectors = np.memmap(self._vec_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+
+
+class VectorIndexStore:
+    """
+    Per-user vector indexes under one directory, with an LRU of open indexes.
+    """
+
+    def __init__(self, base_dir: str, dim: int = 1024, max_open: int = 64):
+        """
+        Initialize VectorIndexStore.
+
+        Args:
+            base_dir: Directory holding the index files.
+            dim: Embedding dimension (fixed for the lifetime of the files).
+            max_open: Maximum user indexes kept memory-mapped at once.
+        """
+        os.makedirs(base_dir, exist_ok=True)
+        self._base_dir = base_dir
+        self._max_open = max_open
+        self.vectorizer = HashingVectorizer(dim)
+        self._indexes: "OrderedDict[str, UserVectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, user_email: str, text: str, meta: Dict[str, Any]) -> bool:
+        """
+        Embed and index one summary for a user.
+
+        Args:
+            user_email: Mailbox owner.
+            text: Text to embed (e.g. subject plus summary).
+            meta: Row metadata; must include ``message_id``.
+
+        Returns:
+            False if the message was already indexed.
+        """
+        return self._index(user_email).add(self.vectorizer.transform(text), meta)
+
+    def search(self, user_email: str, text: str, k: int,
+               exclude_thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find a user's summaries most relevant to a text.
+
+        Args:
+            user_email: Mailbox owner.
+            text: Query text (e.g. the new email's subject and snippet).
+            k: Maximum results.
+            exclude_thread_id: Thread to leave out.
+
+        Returns:
+            Metadata dictionaries with a ``score`` key, best first.
+        """
+        return self._index(user_email).search(self.vectorizer.transform(text), k, exclude_thread_id)
+
+    def close(self) -> None:
+        """
+        Flush and close every open index.
+        """
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
+
+    def _index(self, user_email: str) -> UserVectorIndex:
+        key = hashlib.sha256(user_email.lower().encode("utf-8")).hexdigest()[:32]
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = UserVectorIndex(os.path.join(self._base_dir, key), self.vectorizer.dim)
+                self._indexes[key] = index
+                while len(self._indexes) > self._max_open:
+                    _, evicted = self._indexes.popitem(last=False)
+                    evicted.close()
+            self._indexes.move_to_end(key)
+            return index
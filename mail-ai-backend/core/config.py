@@ -8,14 +8,15 @@ Principle by handling only configuration concerns.
 
 import os
 from typing import List
-from pydantic import BaseSettings
+from core.processor_config import ProcessorSettings
 
 
-class Settings(BaseSettings):
+class Settings(ProcessorSettings):
     """
     Application settings loaded from environment variables.
 
-    Uses Pydantic for validation and type conversion.
+    Uses Pydantic for validation and type conversion. The processing knobs,
+    which all have defaults, are inherited from ProcessorSettings.
     """
     # Database settings
     mongo_url: str = "mongodb://localhost:27017"
@@ -53,10 +54,6 @@ class Settings(BaseSettings):
     cors_allow_methods: List[str] = ["*"]
     cors_allow_headers: List[str] = ["*"]
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
-
 
 # Global settings instance
 settings = Settings()
@@ -10,6 +10,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from common.database import Database
 from common.user_repository import MongoUserRepository
 from common.email_repository import MongoEmailRepository
+from common.summary_cache_repository import MongoSummaryCacheRepository
 from services.auth.auth_service import GoogleAuthService
 from services.auth.user_service import UserService
 from services.email_processor.email_processor import EmailProcessor
@@ -38,6 +39,7 @@ class Dependencies:
         # Initialize repositories
         self._user_repository = MongoUserRepository(self._database)
         self._email_repository = MongoEmailRepository(self._database)
+        self._summary_cache_repository = MongoSummaryCacheRepository(self._database)
 
     def get_user_service(self) -> UserService:
         """
@@ -64,7 +66,7 @@ class Dependencies:
         Returns:
             Configured EmailProcessor with dependencies injected.
         """
-        return EmailProcessor(self._user_repository, self._email_repository)
+        return EmailProcessor(self._user_repository, self._email_repository, self._summary_cache_repository)
 
     def close(self):
         """
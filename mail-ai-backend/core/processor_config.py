@@ -0,0 +1,66 @@
+"""
+Processor configuration module for the Mail AI Backend application.
+
+This module holds the settings of the email and event processors: flow
+control, batching, routing and context knobs. Every setting has a default,
+so the event processor starts (e.g. for a local load test) without the OAuth
+and API-key settings that only the auth services require.
+"""
+
+from typing import Dict, List
+from pydantic import BaseSettings
+
+
+class ProcessorSettings(BaseSettings):
+    """
+    Processor settings loaded from environment variables.
+
+    Uses Pydantic for validation and type conversion.
+    """
+    # Event processor settings
+    pubsub_max_outstanding_messages: int = 100  # In-flight events per pod before the subscriber stops pulling
+    pubsub_max_outstanding_bytes: int = 10 * 1024 * 1024
+    worker_concurrency: int = 32  # Worker tasks draining the sync queue
+    work_queue_size: int = 256  # Queued syncs before producers block
+    coalesce_window_seconds: float = 2.0  # Notifications for one mailbox within this window share a sync
+    sync_claim_lease_seconds: int = 600  # A crashed worker's claim on a mailbox's history range expires after this
+    stats_log_interval_seconds: int = 60
+    shutdown_drain_timeout_seconds: float = 25.0  # Keep below the pod's terminationGracePeriodSeconds
+    sharding_enabled: bool = False  # Each replica only processes mailboxes it owns on the hash ring
+    shard_lease_ttl_seconds: int = 30
+    shard_virtual_nodes: int = 64
+    shard_forward_topic: str = "gmail-events-forward"  # Non-owners republish here; each replica reads its own filtered subscription
+    summary_batch_max_size: int = 8  # Emails packed into one LLM request; 1 disables batching
+    summary_batch_max_wait_seconds: float = 0.3  # Longest a summary waits for others to batch with
+    prompt_max_input_tokens: int = 3000  # Whole-prompt budget; the new email is reserved first, then newest context
+    ai_routing_enabled: bool = True  # Fail over between providers based on rolling health
+    ai_failover_providers: List[str] = ["gemini", "openai"]  # Only list providers that have API keys set
+    ai_circuit_failure_threshold: int = 5  # Consecutive failures that open a provider's circuit
+    ai_circuit_cooldown_seconds: float = 30.0
+    ai_attempt_timeout_seconds: float = 30.0  # A slower attempt counts as a failure and fails over
+    ai_slow_provider_factor: float = 3.0  # Demote the preferred provider when its p95 is this many times worse
+    ai_hedge_percentiles: Dict[str, float] = {}  # Provider -> latency percentile after which a hedge is sent, e.g. {"gemini": 95}
+    ai_hedge_budget_ratio: float = 0.05  # Hedges may add at most this fraction of extra requests
+    ai_hedge_min_samples: int = 20  # Successful calls needed before a provider's latency is trusted for hedging
+    ai_model_ladders: Dict[str, List[str]] = {}  # Provider -> models, fastest first, e.g. {"gemini": ["gemini-1.5-flash-8b", "gemini-1.5-flash", "gemini-1.5-pro"]}
+    ai_model_token_steps: List[int] = [800, 2500]  # Input tokens above each step move a summary one model up the ladder
+    ai_model_backlog_queue_depth: int = 64  # Every this many queued syncs moves summaries one model down; 0 = off
+    thread_digest_enabled: bool = True  # Context = rolling thread digest + last few entries instead of last N logs
+    thread_digest_recent_entries: int = 3  # Entries kept verbatim; older ones are folded into the digest
+    vector_index_enabled: bool = True  # Add relevant summaries from other threads via a local hashing-vector index
+    vector_index_dir: str = "data/vector_index"  # Per-user memory-mapped indexes; use a persistent volume in k8s
+    vector_index_dim: int = 1024  # Fixed once index files exist
+    context_retrieval_top_k: int = 5  # Related summaries from the user's other threads, added to every summary prompt
+    summary_cache_enabled: bool = True  # Reuse summaries of identical content (bulk mail) across users
+    summary_cache_max_entries: int = 10000  # In-process LRU size in front of the Mongo cache
+    summary_cache_ttl_seconds: int = 7 * 24 * 3600
+    triage_enabled: bool = True  # Skip or template-summarize automated mail before any LLM call
+    triage_classifier_threshold: float = 0.8  # Local classifier probability that alone marks mail as automated
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+
+
+# Global processor settings instance
+settings = ProcessorSettings()
@@ -7,10 +7,11 @@ Principle by focusing solely on authentication operations.
 """
 
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from common.interfaces import IAuthService
+from common.gmail_client import AsyncGmailClient
+from common.gmail_service_cache import build_service
 from core.config import settings
 
 
@@ -72,7 +73,8 @@ class GoogleAuthService(IAuthService):
             code: Authorization code from OAuth callback.
 
         Returns:
-            Dict containing user email and watch status.
+            Dict containing user email, refresh token and watch status, plus
+            ``last_history_id`` (the sync cursor to store) if the watch started.
         """
         flow = Flow.from_client_secrets_file(
             self._client_secrets_file,
@@ -85,36 +87,43 @@ class GoogleAuthService(IAuthService):
         creds = flow.credentials
 
         # Get user email
-        oauth_service = build('oauth2', 'v2', credentials=creds)
+        oauth_service = build_service('oauth2', 'v2', credentials=creds)
         user_info = oauth_service.userinfo().get().execute()
         email = user_info['email']
 
         # Setup Gmail watch
-        watch_status = await self._setup_gmail_watch(creds)
+        watch_status, history_id = await self._setup_gmail_watch(creds.token)
 
-        return {
+        user_data = {
             "email": email,
             "watch_status": watch_status,
             "refresh_token": creds.refresh_token
         }
+        if history_id:
+            user_data["last_history_id"] = history_id
+        return user_data
 
-    async def _setup_gmail_watch(self, creds) -> str:
+    async def _setup_gmail_watch(self, token: str) -> Tuple[str, Optional[str]]:
         """
         Setup Gmail push notifications (watch).
 
+        The history ID in the watch response is where notifications start, so
+        storing it as the sync cursor lets the processor sync exactly the mail
+        that arrives from then on.
+
         Args:
-            creds: OAuth credentials.
+            token: OAuth access token.
 
         Returns:
-            Status string indicating success or failure.
+            Tuple of (status string indicating success or failure, history ID
+            to store as the sync cursor or None if the watch failed).
         """
         try:
-            gmail_service = build('gmail', 'v1', credentials=creds)
             request_body = {
                 'labelIds': ['INBOX'],
                 'topicName': f"projects/{settings.project_id}/topics/gmail-events"
             }
-            gmail_service.users().watch(userId='me', body=request_body).execute()
-            return "Active"
+            response = await AsyncGmailClient(token).watch(request_body)
+            return "Active", str(response['historyId'])
         except Exception as e:
-            return f"Failed ({str(e)})"
+            return f"Failed ({str(e)})", None
@@ -7,7 +7,6 @@ from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
@@ -19,6 +18,9 @@ from common.database import db
 from common.user_repository import MongoUserRepository
 from common.email_repository import MongoEmailRepository
 from common.interfaces import IUserRepository, IEmailRepository
+from common.gmail_client import AsyncGmailClient
+from common.credential_manager import CredentialManager, TokenRefreshError
+from common.gmail_service_cache import build_service, preload_discovery_docs
 
 # --- 3. CONFIGURATION ---
 CLIENT_SECRETS_FILE = "services/auth_service/client_secret.json"
@@ -31,6 +33,7 @@ REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 PROJECT_ID = os.getenv("PROJECT_ID")
 
 app = FastAPI()
+credentials = CredentialManager(os.getenv("GOOGLE_CLIENT_ID"), os.getenv("GOOGLE_CLIENT_SECRET"))
 
 # --- 4. MIDDLEWARE (CORS) ---
 app.add_middleware(
@@ -51,11 +54,24 @@ def get_email_repo() -> IEmailRepository:
 @app.on_event("startup")
 async def startup():
     db.connect()
+    preload_discovery_docs(('oauth2', 'v2'))
 
 @app.on_event("shutdown")
 async def shutdown():
+    await credentials.close()
+    await AsyncGmailClient.close_shared_http()
     db.close()
 
+async def start_watch(token: str) -> dict:
+    # (Re)starts push notifications; the returned historyId becomes the sync cursor, so the
+    # processor syncs exactly what arrives from here on instead of guessing from the latest message
+    try:
+        request_body = {'labelIds': ['INBOX'], 'topicName': f"projects/{PROJECT_ID}/topics/gmail-events"}
+        response = await AsyncGmailClient(token).watch(request_body)
+    except Exception as e:
+        return {"watch_status": f"Failed ({e})"}
+    return {"watch_status": "Active", "last_history_id": str(response['historyId'])}
+
 # --- 6. DATA MODELS ---
 class UserCheckRequest(BaseModel):
     email: str
@@ -98,7 +114,15 @@ async def toggle_status(
 
     new_status = not user.get("is_active", False)
     last_started = datetime.utcnow() if new_status else None
-    
+
+    if new_status:
+        # Notifications were ignored while stopped; restart the cursor (and the watch) from now
+        try:
+            token, _ = await credentials.get_access_token(email, user.get("refresh_token"))
+        except TokenRefreshError as e:
+            return {"error": "Google access was revoked; sign in again" if e.permanent else str(e)}
+        await user_repo.create_or_update_user({"email": email, **await start_watch(token)})
+
     await user_repo.update_user_status(email, new_status, last_started)
     
     return {"status": "success", "is_active": new_status}
@@ -126,21 +150,16 @@ async def callback(
     flow.fetch_token(code=code)
     creds = flow.credentials
 
-    service = build('oauth2', 'v2', credentials=creds)
+    service = build_service('oauth2', 'v2', credentials=creds)
     email = service.userinfo().get().execute()['email']
 
-    try:
-        gmail_service = build('gmail', 'v1', credentials=creds)
-        request_body = {'labelIds': ['INBOX'], 'topicName': f"projects/{PROJECT_ID}/topics/gmail-events"}
-        gmail_service.users().watch(userId='me', body=request_body).execute()
-        watch_status = "Active"
-    except Exception as e:
-        watch_status = f"Failed ({e})"
+    watch = await start_watch(creds.token)
+    watch_status = watch["watch_status"]
 
     user_data = {
         "email": email,
         "refresh_token": creds.refresh_token,
-        "watch_status": watch_status
+        **watch
     }
     
     existing_user = await user_repo.get_user_by_email(email)
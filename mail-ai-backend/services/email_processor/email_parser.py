@@ -6,7 +6,10 @@ It follows the Single Responsibility Principle by focusing solely on
 email content extraction and formatting.
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from common.gmail_batch import GmailBatchFetcher
+from common.gmail_client import AsyncGmailClient
 
 
 class EmailParser:
@@ -17,20 +20,21 @@ class EmailParser:
     structured dictionaries for further processing.
     """
 
-    def __init__(self):
+    def __init__(self, batch_fetcher: Optional[GmailBatchFetcher] = None):
         """
         Initialize EmailParser.
 
-        No dependencies required for basic parsing operations.
+        Args:
+            batch_fetcher: Fetcher used when parsing several messages at once.
         """
-        pass
+        self._batch_fetcher = batch_fetcher or GmailBatchFetcher()
 
-    async def parse_email(self, gmail_service, message_id: str) -> Optional[Dict[str, Any]]:
+    async def parse_email(self, gmail_client: AsyncGmailClient, message_id: str) -> Optional[Dict[str, Any]]:
         """
         Parse a Gmail message into structured data.
 
         Args:
-            gmail_service: Authenticated Gmail API service instance.
+            gmail_client: Authenticated async Gmail client.
             message_id: Gmail message ID to parse.
 
         Returns:
@@ -38,28 +42,74 @@ class EmailParser:
         """
         try:
             # Fetch full message
-            msg = gmail_service.users().messages().get(userId='me', id=message_id).execute()
-
-            # Extract headers
-            headers = msg['payload']['headers']
-            subject = self._extract_header(headers, 'Subject', 'No Subject')
-            sender = self._extract_header(headers, 'From', 'Unknown')
-            snippet = msg.get('snippet', '')
-            label_ids = msg.get('labelIds', [])
-
-            return {
-                'message_id': message_id,
-                'subject': subject,
-                'sender': sender,
-                'snippet': snippet,
-                'label_ids': label_ids,
-                'headers': headers
-            }
+            msg = await gmail_client.get_message(message_id)
+            return self._parse_message(msg)
 
         except Exception as e:
             print(f"[Email Parser Error]: Failed to parse message {message_id}: {e}")
             return None
 
+    async def parse_emails(self, gmail_client: AsyncGmailClient, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Parse several Gmail messages, fetching them in batched round trips.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            message_ids: Gmail message IDs to parse.
+
+        Returns:
+            List of parsed email dictionaries in the order of message_ids.
+            Messages deleted since they were listed, and messages that fail
+            to parse, are left out.
+
+        Raises:
+            Exception: If a fetch failed for any other reason (expired token,
+                rate limit, server or network error), so the caller retries the
+                history range instead of skipping it.
+        """
+        messages = await self._batch_fetcher.get_messages(gmail_client, message_ids)
+
+        parsed = []
+        for message_id in message_ids:
+            msg = messages.get(message_id)
+            if not msg:
+                continue  # Deleted before we got to it
+            try:
+                parsed.append(self._parse_message(msg))
+            except Exception as e:
+                print(f"[Email Parser Error]: Failed to parse message {message_id}: {e}")
+
+        return parsed
+
+    def _parse_message(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a full-format Gmail message resource into structured data.
+
+        Args:
+            msg: Gmail message resource.
+
+        Returns:
+            Dictionary with parsed email data.
+        """
+        # Extract headers
+        headers = msg['payload']['headers']
+        subject = self._extract_header(headers, 'Subject', 'No Subject')
+        sender = self._extract_header(headers, 'From', 'Unknown')
+        snippet = msg.get('snippet', '')
+        label_ids = msg.get('labelIds', [])
+        timestamp = datetime.fromtimestamp(int(msg['internalDate']) / 1000)
+
+        return {
+            'message_id': msg['id'],
+            'thread_id': msg['threadId'],
+            'subject': subject,
+            'sender': sender,
+            'snippet': snippet,
+            'label_ids': label_ids,
+            'headers': headers,
+            'timestamp': timestamp
+        }
+
     def _extract_header(self, headers: list, header_name: str, default: str = '') -> str:
         """
         Extract a specific header value from Gmail headers.
@@ -6,6 +6,7 @@ email age validation, and deduplication. It follows the Single Responsibility Pr
 by focusing solely on validation concerns.
 """
 
+import uuid
 from typing import Optional, Dict, Any
 from datetime import datetime
 from common.interfaces import IUserRepository, IEmailRepository
@@ -19,16 +20,20 @@ class EmailValidator:
     user status, email age, and duplication checks.
     """
 
-    def __init__(self, user_repository: IUserRepository, email_repository: IEmailRepository):
+    def __init__(self, user_repository: IUserRepository, email_repository: IEmailRepository,
+                 sync_claim_lease_seconds: int = 600):
         """
         Initialize EmailValidator with repositories.
 
         Args:
             user_repository: Repository for user data access.
             email_repository: Repository for email data access.
+            sync_claim_lease_seconds: How long a history range claim blocks
+                other workers if its holder dies.
         """
         self._user_repository = user_repository
         self._email_repository = email_repository
+        self._sync_claim_lease = sync_claim_lease_seconds
 
     async def validate_user_active(self, email_address: str) -> tuple[bool, Optional[Dict[str, Any]]]:
         """
@@ -49,6 +54,49 @@ class EmailValidator:
 
         return True, user
 
+    async def validate_sync_claim(self, email_address: str, start_history_id: Optional[str],
+                                  end_history_id: Optional[str]) -> Optional[str]:
+        """
+        Claim the Gmail history range for this event.
+
+        Takes an expiring claim on the range after the user's sync cursor, so
+        that when several notifications for the same mailbox race only one of
+        them fetches and summarizes it. The cursor itself only moves when the
+        claim is committed after a successful sync.
+
+        Args:
+            email_address: User's email address.
+            start_history_id: Cursor value read from the user record.
+            end_history_id: History ID from the notification.
+
+        Returns:
+            Claim ID if this event owns the range, None if it should be skipped.
+
+        Raises:
+            RuntimeError: If another worker holds an older range, so this
+                event must be retried once that sync finishes.
+        """
+        if not end_history_id:
+            return None
+
+        if start_history_id and int(end_history_id) <= int(start_history_id):
+            return None
+
+        owner = uuid.uuid4().hex
+        if await self._user_repository.claim_sync_range(
+            email_address, start_history_id, end_history_id, owner, self._sync_claim_lease
+        ):
+            return owner
+
+        user = await self._user_repository.get_user_by_email(email_address) or {}
+        cursor = user.get('last_history_id')
+        claim = user.get('sync_claim') or {}
+        if cursor and int(end_history_id) <= int(cursor):
+            return None
+        if claim and int(claim['end_history_id']) >= int(end_history_id):
+            return None
+        raise RuntimeError(f"History range for {email_address} is claimed by another worker; retry later")
+
     async def validate_email_age(self, email_timestamp: datetime, user_last_started: Optional[datetime]) -> bool:
         """
         Check if email is newer than user's last activation time.
@@ -7,14 +7,22 @@ It follows the Single Responsibility Principle by acting as a coordinator
 and uses dependency injection for loose coupling.
 """
 
-import os
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from common.interfaces import IEmailProcessor, IUserRepository, IEmailRepository
+from common.interfaces import IEmailProcessor, IUserRepository, IEmailRepository, ISummaryCacheRepository
 from common.models import EmailLog
+from common.credential_manager import CredentialManager, TokenRefreshError
+from common.gmail_client import AsyncGmailClient, GmailApiError
+from common.gmail_service_cache import GmailServiceCache
+from common.gmail_sync import GmailSyncEngine
+from common.summary_batcher import SummaryBatcher
+from common.summary_cache import SummaryCache
+from common.ai_router import AIRouter
+from common.prompt_budget import PromptBudgeter
+from common.email_triage import EmailTriage, TIER_FULL, TIER_SKIP
+from common.single_flight import SingleFlight
+from common.model_ladder import ModelLadder
 from services.email_processor.email_validator import EmailValidator
 from services.email_processor.email_parser import EmailParser
 from services.email_processor.deduplicator import EmailDeduplicator
@@ -31,23 +39,53 @@ class EmailProcessor(IEmailProcessor):
     deduplication, context building, AI summarization, and persistence.
     """
 
-    def __init__(self, user_repository: IUserRepository, email_repository: IEmailRepository):
+    def __init__(self, user_repository: IUserRepository, email_repository: IEmailRepository,
+                 summary_cache_repository: Optional[ISummaryCacheRepository] = None):
         """
         Initialize EmailProcessor with dependencies.
 
         Args:
             user_repository: Repository for user data access.
             email_repository: Repository for email data access.
+            summary_cache_repository: Shared store for cached summaries.
         """
         self._user_repository = user_repository
         self._email_repository = email_repository
 
         # Initialize components
-        self._validator = EmailValidator(user_repository, email_repository)
+        self._validator = EmailValidator(user_repository, email_repository, settings.sync_claim_lease_seconds)
         self._parser = EmailParser()
         self._deduplicator = EmailDeduplicator()
         self._context_builder = ContextBuilder(email_repository)
-        self._summarizer = EmailSummarizer()
+        summary_cache = None
+        if settings.summary_cache_enabled:
+            summary_cache = SummaryCache(
+                summary_cache_repository, settings.summary_cache_max_entries, settings.summary_cache_ttl_seconds
+            )
+        router = None
+        if settings.ai_routing_enabled:
+            router = AIRouter(
+                settings.ai_failover_providers,
+                failure_threshold=settings.ai_circuit_failure_threshold,
+                cooldown_seconds=settings.ai_circuit_cooldown_seconds,
+                attempt_timeout_seconds=settings.ai_attempt_timeout_seconds,
+                slow_factor=settings.ai_slow_provider_factor,
+                hedge_percentiles=settings.ai_hedge_percentiles,
+                hedge_budget_ratio=settings.ai_hedge_budget_ratio,
+                hedge_min_samples=settings.ai_hedge_min_samples
+            )
+        self._summarizer = EmailSummarizer(
+            SummaryBatcher(
+                settings.summary_batch_max_size, settings.summary_batch_max_wait_seconds, summary_cache, router
+            ),
+            PromptBudgeter(settings.prompt_max_input_tokens),
+            ModelLadder(settings.ai_model_ladders, settings.ai_model_token_steps)
+        )
+        self._single_flight = SingleFlight()
+        self._triage = EmailTriage(settings.triage_classifier_threshold) if settings.triage_enabled else None
+        self._sync_engine = GmailSyncEngine()
+        self._gmail_clients = GmailServiceCache()
+        self._credentials = CredentialManager(settings.google_client_id, settings.google_client_secret)
 
     async def process_email_event(self, email_address: str, history_id: str) -> None:
         """
@@ -58,7 +96,13 @@ class EmailProcessor(IEmailProcessor):
 
         Args:
             email_address: User's email address.
-            history_id: Gmail history ID (not used in current implementation).
+            history_id: Gmail history ID from the push notification.
+
+        Raises:
+            Exception: Any retryable failure after the history range was
+                claimed; the claim is released first so a retry syncs the
+                range again. A revoked refresh token deactivates the user
+                instead, since no retry can succeed.
         """
         try:
             # Step 1: Validate user and get user data
@@ -67,114 +111,261 @@ class EmailProcessor(IEmailProcessor):
                 print(f"[Skipped] User {email_address} is inactive or not found.")
                 return
 
-            # Step 2: Setup Gmail API credentials
-            creds = self._setup_credentials(user['refresh_token'])
-            service = build('gmail', 'v1', credentials=creds)
-
-            # Step 3: Get latest message
-            message_data = await self._get_latest_message(service)
-            if not message_data:
+            # Step 2: Claim the history range so concurrent events skip it
+            start_history_id = user.get('last_history_id')
+            claim_id = await self._validator.validate_sync_claim(email_address, start_history_id, history_id)
+            if not claim_id:
+                print(f"[Skipped] History up to {history_id} already synced or claimed for {email_address}.")
                 return
 
-            msg_id, thread_id, email_time = message_data
+            try:
+                await self._sync_range(user, email_address, start_history_id, history_id)
+            except (Exception, asyncio.CancelledError) as e:
+                # The cursor never moved; hand the range back so a retry syncs it
+                self._invalidate_credentials(email_address, e)
+                await self._user_repository.release_sync_claim(email_address, claim_id)
+                if isinstance(e, TokenRefreshError) and e.permanent:
+                    await self._deactivate_revoked_user(email_address, e)
+                    return
+                raise
+
+            # Step 6: Commit the cursor now that every message in the range is saved
+            if not await self._user_repository.commit_sync_cursor(email_address, claim_id, history_id):
+                print(f"[Warning] History claim for {email_address} expired before it was committed.")
+
+        except Exception as e:
+            print(f"[Processor Error]: {e}")
+            raise
+
+    async def _sync_range(self, user: Dict[str, Any], email_address: str, start_history_id: Optional[str],
+                          history_id: str) -> None:
+        """
+        Fetch and process every new message in a claimed history range.
+
+        Args:
+            user: User document.
+            email_address: User's email address.
+            start_history_id: Stored history cursor the range starts after.
+            history_id: Gmail history ID from the notification.
+
+        Raises:
+            Exception: The first failure; threads that did not fail still finish.
+        """
+        # Step 3: Get an authenticated Gmail client (cached per user)
+        gmail_client = await self._get_gmail_client(email_address, user['refresh_token'])
+
+        # Step 4: Sync new messages in the claimed history range
+        messages = await self._get_new_messages(gmail_client, start_history_id, history_id)
+
+        # Step 5: Process threads concurrently (so summaries can be batched),
+        # keeping messages within a thread in order
+        by_thread: Dict[str, List[Dict[str, Any]]] = {}
+        for email_info in messages:
+            by_thread.setdefault(email_info['thread_id'], []).append(email_info)
+
+        async def process_thread(thread_messages: List[Dict[str, Any]]) -> None:
+            for email_info in thread_messages:
+                await self._process_message(gmail_client, user, email_address, email_info)
+
+        results = await asyncio.gather(*(process_thread(m) for m in by_thread.values()), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+
+    async def _get_gmail_client(self, email_address: str, refresh_token: str) -> AsyncGmailClient:
+        """
+        Return a cached Gmail client for the user, building one if needed.
+
+        Args:
+            email_address: User's email address.
+            refresh_token: User's OAuth refresh token.
+
+        Returns:
+            Authenticated async Gmail client.
+        """
+        # Asked on every event (a memory hit) so the credential manager sees the
+        # user as active and refreshes the token in the background
+        token, expiry = await self._setup_credentials(email_address, refresh_token)
+        gmail_client = self._gmail_clients.get(email_address)
+        if gmail_client is None or gmail_client.access_token != token:
+            gmail_client = AsyncGmailClient(token)
+            self._gmail_clients.put(email_address, gmail_client, expiry)
+        return gmail_client
+
+    def _invalidate_credentials(self, email_address: str, error: BaseException) -> None:
+        """
+        Drop cached credentials after Gmail rejects the access token.
+
+        Without this a revoked or expired token would keep failing every
+        event until the cached entries aged out.
+
+        Args:
+            email_address: User's email address.
+            error: Exception raised by the sync.
+        """
+        if isinstance(error, GmailApiError) and error.status == 401:
+            print(f"[Auth] Gmail rejected the token for {email_address}; dropping cached credentials.")
+            self._credentials.invalidate(email_address)
+            self._gmail_clients.invalidate(email_address)
+
+    async def _deactivate_revoked_user(self, email_address: str, error: TokenRefreshError) -> None:
+        """
+        Stop processing a user whose refresh token Google no longer accepts.
+
+        Args:
+            email_address: User's email address.
+            error: The permanent refresh failure.
+        """
+        print(f"[Auth] Refresh token for {email_address} no longer works; deactivating until they sign in again. ({error})")
+        await self._user_repository.create_or_update_user({
+            'email': email_address, 'is_active': False, 'watch_status': "Revoked (sign in again)"
+        })
+
+    async def _setup_credentials(self, email_address: str, refresh_token: str) -> Tuple[str, datetime]:
+        """
+        Get a Gmail API access token for the user.
+
+        Tokens are cached per user and refreshed ahead of expiry by the
+        credential manager, so this rarely costs a network round trip.
 
-            # Step 4: Validate email age
+        Args:
+            email_address: User's email address.
+            refresh_token: User's OAuth refresh token.
+
+        Returns:
+            Tuple of (access_token, expiry).
+        """
+        return await self._credentials.get_access_token(email_address, refresh_token)
+
+    async def _process_message(self, gmail_client: AsyncGmailClient, user: Dict[str, Any], email_address: str,
+                               email_info: Dict[str, Any]) -> None:
+        """
+        Run validation, summarization and persistence for one parsed message.
+
+        Args:
+            gmail_client: Authenticated async Gmail client.
+            user: User document.
+            email_address: User's email address.
+            email_info: Parsed email data from EmailParser.
+        """
+        msg_id = email_info['message_id']
+        email_time = email_info['timestamp']
+        try:
+            # Validate email age
             is_recent = await self._validator.validate_email_age(email_time, user.get('last_started_at'))
             if not is_recent:
                 print(f"[Skipped] Old email from {email_time}")
                 return
 
-            # Step 5: Check for duplicates
-            is_duplicate = await self._validator.validate_not_duplicate(msg_id)
-            if not is_duplicate:
-                self._deduplicator.mark_processed(msg_id)
-                return
-
-            # Step 6: Parse email content
-            email_info = await self._parser.parse_email(service, msg_id)
-            if not email_info:
-                return
-
-            # Step 7: Validate draft exclusion
+            # Validate draft exclusion
             is_valid_draft = await self._validator.validate_draft_exclusion(email_info['label_ids'])
             if not is_valid_draft:
                 print(f"[Skipped] Draft message {msg_id}")
                 return
 
-            # Step 8: Build conversation context
-            context_depth = user.get('settings', {}).get('context_depth', 10)
-            context_str = await self._context_builder.build_context(
-                thread_id, service, email_address, msg_id, context_depth
-            )
-
-            # Step 9: Generate AI summary
-            ai_provider = user.get('settings', {}).get('ai_provider', 'gemini')
-            summary = await self._summarizer.summarize_email(
-                context_str, email_info['snippet'], ai_provider, settings.context_aware_prompt
+            # Concurrent notifications for the same message share one summarization
+            _, shared = await self._single_flight.do(
+                (email_address, msg_id),
+                lambda: self._summarize_and_save(gmail_client, user, email_address, email_info)
             )
-
-            # Step 10: Save to database
-            await self._save_email_log(email_address, msg_id, thread_id, email_info, summary, ai_provider, email_time)
-
-            # Step 11: Mark as processed
-            self._deduplicator.mark_processed(msg_id)
-
-            print(f"[Success] Processed email {msg_id} for {email_address}")
+            if shared:
+                print(f"[Skipped] Email {msg_id} already being summarized for {email_address}")
 
         except Exception as e:
-            print(f"[Processor Error]: {e}")
+            print(f"[Processor Error]: Failed to process message {msg_id}: {e}")
+            raise
 
-    def _setup_credentials(self, refresh_token: str) -> Credentials:
+    async def _summarize_and_save(self, gmail_client: AsyncGmailClient, user: Dict[str, Any], email_address: str,
+                                  email_info: Dict[str, Any]) -> None:
         """
-        Setup Gmail API credentials from refresh token.
+        Triage, summarize and persist one message; run once per in-flight message.
 
         Args:
-            refresh_token: User's OAuth refresh token.
+            gmail_client: Authenticated async Gmail client.
+            user: User document.
+            email_address: User's email address.
+            email_info: Parsed email data from EmailParser.
+        """
+        msg_id = email_info['message_id']
+        thread_id = email_info['thread_id']
+        if self._deduplicator.is_duplicate(msg_id):
+            # Completed by a call that left the single-flight just before this one entered
+            return
+
+        # Triage: automated mail is skipped or template-summarized without an LLM call
+        ai_provider = user.get('settings', {}).get('ai_provider', 'gemini')
+        tier, kind, ai_model = TIER_FULL, None, None
+        if self._triage:
+            tier, kind = self._triage.classify(
+                email_info['headers'], email_info['label_ids'], email_info['sender'],
+                email_info['subject'], email_info['snippet']
+            )
 
-        Returns:
-            Google API credentials object.
-        """
-        creds = Credentials(
-            None,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.google_client_id,
-            client_secret=settings.google_client_secret
+        if tier == TIER_SKIP:
+            summary = ""
+        elif tier != TIER_FULL:
+            summary = self._triage.template_summary(
+                kind, email_info['sender'], email_info['subject'], email_info['snippet']
+            )
+        else:
+            # Build conversation context
+            context_depth = user.get('settings', {}).get('context_depth', 10)
+            context_str = await self._context_builder.build_context(
+                thread_id, gmail_client, email_address, msg_id, context_depth
+            )
+
+            # Generate AI summary
+            summary, ai_provider, ai_model = await self._summarizer.summarize_email(
+                context_str, email_info['snippet'], ai_provider, settings.context_aware_prompt,
+                user.get('settings', {}).get('allowed_providers'), 'IMPORTANT' in email_info['label_ids'],
+                email_address
+            )
+
+        # Save to database
+        await self._save_email_log(
+            email_address, msg_id, thread_id, email_info, summary, ai_provider, email_info['timestamp'], tier,
+            ai_model
         )
 
-        if not creds.valid:
-            creds.refresh(Request())
+        # Mark as processed
+        self._deduplicator.mark_processed(msg_id)
 
-        return creds
+        print(f"[Success] Processed email {msg_id} for {email_address}")
 
-    async def _get_latest_message(self, service) -> Optional[tuple]:
+    async def _get_new_messages(self, gmail_client: AsyncGmailClient, start_history_id: Optional[str],
+                                end_history_id: str) -> List[Dict[str, Any]]:
         """
-        Get the latest message from user's inbox.
+        Get and parse all unprocessed messages in a claimed history range.
+
+        Duplicates are dropped before anything is fetched, and the remaining
+        messages are retrieved in batched round trips.
 
         Args:
-            service: Gmail API service instance.
+            gmail_client: Authenticated async Gmail client.
+            start_history_id: Stored history cursor the range starts after.
+            end_history_id: Gmail history ID from the notification.
 
         Returns:
-            Tuple of (message_id, thread_id, timestamp) or None.
+            List of parsed email dictionaries, oldest first.
         """
-        results = service.users().messages().list(userId='me', maxResults=1).execute()
-        messages = results.get('messages', [])
-        if not messages:
-            return None
-
-        msg_id = messages[0]['id']
-        thread_id = messages[0]['threadId']
-
-        # Get message metadata
-        msg_meta = service.users().messages().get(userId='me', id=msg_id, format='minimal').execute()
-        internal_date = int(msg_meta['internalDate']) / 1000
-        email_time = datetime.fromtimestamp(internal_date)
+        refs, _ = await self._sync_engine.sync(gmail_client, start_history_id, end_history_id)
+
+        pending_ids = []
+        for ref in refs:
+            msg_id = ref['id']
+            if self._deduplicator.is_duplicate(msg_id):
+                continue
+            if not await self._validator.validate_not_duplicate(msg_id):
+                self._deduplicator.mark_processed(msg_id)
+                continue
+            pending_ids.append(msg_id)
 
-        return msg_id, thread_id, email_time
+        return await self._parser.parse_emails(gmail_client, pending_ids)
 
     async def _save_email_log(self, email_address: str, msg_id: str, thread_id: str,
                             email_info: Dict[str, Any], summary: str, ai_provider: str,
-                            email_time: datetime) -> None:
+                            email_time: datetime, tier: str = TIER_FULL,
+                            ai_model: Optional[str] = None) -> None:
         """
         Save processed email to database.
 
@@ -184,8 +375,10 @@ class EmailProcessor(IEmailProcessor):
             thread_id: Gmail thread ID.
             email_info: Parsed email information.
             summary: AI-generated summary.
-            ai_provider: AI provider used.
+            ai_provider: AI provider that produced the summary.
             email_time: Email timestamp.
+            tier: Triage tier the summary was produced by.
+            ai_model: Model that produced the summary, if an LLM was called.
         """
         direction = "outbound" if 'SENT' in email_info['label_ids'] else "inbound"
 
@@ -197,8 +390,10 @@ class EmailProcessor(IEmailProcessor):
             subject=email_info['subject'],
             summary=summary,
             ai_provider=ai_provider,
+            ai_model=ai_model,
             timestamp=email_time,
-            direction=direction
+            direction=direction,
+            tier=tier
         )
 
         await self._email_repository.insert_email_logs([log_entry.dict()])
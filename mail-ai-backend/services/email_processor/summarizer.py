@@ -7,9 +7,12 @@ solely on summarization operations and uses the Strategy Pattern for
 different AI services.
 """
 
-from typing import Optional
+from typing import List, Optional, Tuple, Union
 from common.ai_factory import AIFactory
 from common.interfaces import IAIService
+from common.model_ladder import ModelLadder
+from common.prompt_budget import PromptBudgeter
+from common.summary_batcher import SummaryBatcher
 
 
 class EmailSummarizer:
@@ -19,62 +22,89 @@ class EmailSummarizer:
     Uses AI services to generate summaries of email content with context.
     """
 
-    def __init__(self):
+    def __init__(self, batcher: Optional[SummaryBatcher] = None,
+                 budgeter: Optional[PromptBudgeter] = None, ladder: Optional[ModelLadder] = None):
         """
         Initialize EmailSummarizer.
 
-        Note: AI service is created per request to ensure up-to-date configuration.
-        """
-        pass
+        Args:
+            batcher: Batcher that packs concurrent summaries into one LLM
+                request. Defaults to one that never batches.
+            budgeter: Token budgeter used to size prompts.
+            ladder: Per-provider model ladder; None always uses the
+                provider's default model.
 
-    async def summarize_email(self, context_str: str, email_content: str,
-                            ai_provider: str, prompt_template: str) -> str:
+        Note: AI service clients are cached per provider and model by AIFactory.
+        """
+        self._batcher = batcher or SummaryBatcher(max_batch_size=1)
+        self._budgeter = budgeter or PromptBudgeter()
+        self._ladder = ladder or ModelLadder({})
+
+    async def summarize_email(self, context_str: Union[str, List[str]], email_content: str,
+                            ai_provider: str, prompt_template: str,
+                            allowed_providers: Optional[List[str]] = None,
+                            important: bool = False, user_email: str = "") -> Tuple[str, str, Optional[str]]:
         """
         Generate AI summary of an email with context.
 
         Args:
-            context_str: Historical conversation context.
+            context_str: Historical conversation context, either as entries
+                (oldest first) or as a string with one entry per line.
             email_content: Current email content to summarize.
             ai_provider: AI provider to use ('gemini', 'openai', etc.).
             prompt_template: Template for the AI prompt.
+            allowed_providers: Providers the user permits for failover.
+            important: Whether Gmail marked the message IMPORTANT.
+            user_email: Mailbox owner; batches never mix users.
 
         Returns:
-            AI-generated summary string.
+            Tuple of (AI-generated summary, provider used, model used); after
+            failover these name the provider that answered.
         """
+        model = None
         try:
-            # Get AI service instance
-            ai_service = AIFactory.get_service(ai_provider)
+            # Build full prompt within the target model's token budget
+            model = AIFactory.get_service(ai_provider).model_name
+            full_prompt = self._build_prompt(prompt_template, context_str, email_content, model)
 
-            # Build full prompt
-            full_prompt = self._build_prompt(prompt_template, context_str, email_content)
+            # Pick the model from the provider's ladder by prompt size and importance
+            ladder_model = self._ladder.select(ai_provider, self._budgeter.count_tokens(full_prompt, model), important)
+            model = ladder_model or model
 
             # Generate summary
-            summary = ai_service.summarize(full_prompt, "Context-Aware Email Summary")
-
-            return summary
+            return await self._batcher.summarize(
+                user_email, ai_provider, full_prompt, "Context-Aware Email Summary", allowed_providers, ladder_model
+            )
 
         except Exception as e:
             print(f"[Summarizer Error]: {e}")
-            return f"AI Summarization Failed: {str(e)}"
+            return f"AI Summarization Failed: {str(e)}", ai_provider, model
 
-    def _build_prompt(self, template: str, context: str, email_content: str) -> str:
+    def _build_prompt(self, template: str, context: Union[str, List[str]], email_content: str,
+                      model: str = "") -> str:
         """
         Build the complete prompt from template and content.
 
+        The email is reserved first; context entries fill the remaining token
+        budget newest-first and the oldest are dropped.
+
         Args:
             template: Prompt template string.
-            context: Conversation context.
+            context: Conversation context entries, or one entry per line.
             email_content: Email content.
+            model: Provider model name used for token counting.
 
         Returns:
             Complete prompt string.
         """
+        entries = context.splitlines() if isinstance(context, str) else list(context or [])
+        email_content, context_str = self._budgeter.fit(template, email_content, entries, model)
         try:
             return template.format(
-                context=context or "No previous conversation history.",
+                context=context_str,
                 email_content=email_content
             )
         except KeyError as e:
             # Fallback if template has missing placeholders
             print(f"[Prompt Build Error]: {e}. Using fallback.")
-            return f"Context: {context}\n\nEmail: {email_content}\n\nPlease summarize this email."
+            return f"Context: {context_str}\n\nEmail: {email_content}\n\nPlease summarize this email."
@@ -0,0 +1,91 @@
+import asyncio
+
+
+class _PendingSync:
+    def __init__(self, history_id, future):
+        self.history_id = history_id
+        self.future = future
+        self.notifications = 1
+        self.timer = None
+
+
+class NotificationCoalescer:
+    """
+    Merges bursts of Gmail notifications for the same mailbox into one sync.
+
+    The first notification for an address opens a window; every notification
+    arriving for that address before the window closes joins it and only the
+    highest historyId is kept. All callers await the same sync result, so the
+    Pub/Sub messages can be acked or nacked together.
+    """
+
+    def __init__(self, dispatch, window_seconds: float = 2.0):
+        # dispatch: async callable(email_address, history_id)
+        self._dispatch = dispatch
+        self._window = window_seconds
+        self._pending = {}
+        self.notifications_received = 0
+        self.syncs_executed = 0
+
+    async def submit(self, email_address, history_id):
+        """
+        Registers a notification and waits for the sync that covers it.
+        Must be awaited on the event loop that owns the coalescer.
+        """
+        self.notifications_received += 1
+        pending = self._pending.get(email_address)
+
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = _PendingSync(history_id, loop.create_future())
+            self._pending[email_address] = pending
+            pending.timer = loop.call_later(self._window, self._schedule_flush, email_address)
+        else:
+            pending.notifications += 1
+            if self._newer(history_id, pending.history_id):
+                pending.history_id = history_id
+
+        # Shield so one cancelled waiter does not cancel the shared result
+        return await asyncio.shield(pending.future)
+
+    def stats(self):
+        return {
+            "notifications_received": self.notifications_received,
+            "syncs_executed": self.syncs_executed,
+            "pending_mailboxes": len(self._pending),
+        }
+
+    def flush_now(self):
+        """Closes every open window immediately, e.g. when draining on shutdown."""
+        for email_address, pending in list(self._pending.items()):
+            pending.timer.cancel()
+            self._schedule_flush(email_address)
+
+    def _schedule_flush(self, email_address):
+        asyncio.ensure_future(self._flush(email_address))
+
+    async def _flush(self, email_address):
+        pending = self._pending.pop(email_address, None)
+        if pending is None:
+            return
+
+        self.syncs_executed += 1
+        if pending.notifications > 1:
+            print(f"[Coalesced] {pending.notifications} notifications for {email_address} into one sync")
+
+        try:
+            result = await self._dispatch(email_address, pending.history_id)
+        except Exception as e:
+            pending.future.set_exception(e)
+        else:
+            pending.future.set_result(result)
+        finally:
+            # Cancelled (e.g. at shutdown) or a BaseException: waiters must still get an answer to settle on
+            if not pending.future.done():
+                pending.future.cancel()
+
+    @staticmethod
+    def _newer(history_id, current):
+        if not history_id:
+            return False
+        return not current or int(history_id) > int(current)
@@ -1,21 +1,57 @@
+import asyncio
 from datetime import datetime
+from common.ai_factory import is_error_summary
 from common.models import EmailLog
-from common.interfaces import IEmailRepository
+from common.interfaces import IEmailRepository, IThreadDigestRepository
+from common.gmail_batch import GmailBatchFetcher, GONE_STATUSES
+from common.gmail_client import GmailApiError
+from common.vector_index import VectorIndexStore
+from services.event_processor.thread_digest import ThreadDigester
+
+# Concurrent updates of one thread's digest retry against the fresh copy this many times
+DIGEST_SAVE_ATTEMPTS = 5
 
 class ContextEngine:
-    def __init__(self, email_repo: IEmailRepository):
+    def __init__(self, email_repo: IEmailRepository, digest_repo: IThreadDigestRepository = None,
+                 digester: ThreadDigester = None, vector_store: VectorIndexStore = None):
         self.email_repo = email_repo
+        self.batch_fetcher = GmailBatchFetcher()
+        # With a digest repo, context is one digest read instead of the last N logs
+        self.digest_repo = digest_repo
+        self.digester = digester or ThreadDigester()
+        # Optional relevance retrieval across all of the user's threads
+        self.vector_store = vector_store
+
+    async def prefetch_threads(self, gmail_client, thread_ids, limit: int = 10, user_email: str = None) -> dict:
+        # Batch-fetch every thread that will need a Gmail backfill in one round trip
+        needs_backfill = []
+        for thread_id in dict.fromkeys(thread_ids):
+            if self.digest_repo and user_email and await self.digest_repo.get_digest(user_email, thread_id):
+                continue  # Context comes from the digest; no backfill needed
+            if thread_id and len(await self.email_repo.get_thread_logs(thread_id, limit=limit)) < limit:
+                needs_backfill.append(thread_id)
+        if len(needs_backfill) < 2:
+            return {}
+        return await self.batch_fetcher.get_threads(gmail_client, needs_backfill)
+
+    async def get_thread_context(self, thread_id: str, gmail_client, user_email: str, current_message_id: str, limit: int = 10, thread_data: dict = None) -> list:
+        # Returns one formatted entry per log, oldest first, so the prompt budgeter can drop the oldest
+        if not thread_id: return []
 
-    async def get_thread_context(self, thread_id: str, gmail_service, user_email: str, current_message_id: str, limit: int = 10) -> str:
-        if not thread_id: return ""
+        if self.digest_repo:
+            digest = await self.digest_repo.get_digest(user_email, thread_id)
+            if digest:
+                return self.digester.format(digest)
 
-        existing_logs = await self.email_repo.get_thread_logs(thread_id, limit=100)
+        # Newest first when the thread is long: the digest and the last-N fallback both need the latest logs
+        existing_logs = await self.email_repo.get_thread_logs(thread_id, limit=100, latest=True)
         
         if len(existing_logs) >= limit:
-            return self._format_logs(existing_logs[-limit:])
+            return await self._bootstrap_digest(user_email, thread_id, existing_logs) or self._format_logs(existing_logs[-limit:])
 
         try:
-            thread_data = gmail_service.users().threads().get(userId='me', id=thread_id).execute()
+            if thread_data is None:
+                thread_data = await gmail_client.get_thread(thread_id)
             messages = thread_data.get('messages', [])
             
             existing_ids = {log['message_id'] for log in existing_logs}
@@ -51,13 +87,74 @@ class ContextEngine:
                 existing_logs.sort(key=lambda x: x['timestamp'])
 
         except Exception as e:
-            print(f"   [ContextEngine Error]: {e}")
-        
-        return self._format_logs(existing_logs[-limit:])
+            if isinstance(e, GmailApiError) and e.status in GONE_STATUSES:
+                # Deleted since it was listed; retrying would never succeed, so use what we have
+                print(f"   [ContextEngine]: Thread {thread_id} no longer exists; using stored context")
+            else:
+                # Summarizing without the thread would store a context-less summary for good; let the event retry
+                print(f"   [ContextEngine Error]: {e}")
+                raise
+
+        return await self._bootstrap_digest(user_email, thread_id, existing_logs) or self._format_logs(existing_logs[-limit:])
+
+    async def related_context(self, user_email: str, query: str, thread_id: str, k: int = 5) -> list:
+        # Most relevant summaries from the user's other threads, least relevant first so the budgeter drops it first
+        if not self.vector_store or k <= 0: return []
+        try:
+            # Memory-mapped scan and index loading are blocking; keep them off the event loop
+            hits = await asyncio.to_thread(self.vector_store.search, user_email, query, k, thread_id)
+        except Exception as e:
+            print(f"   [ContextEngine Error]: Retrieval failed: {e}")
+            return []
+        return [
+            f"[Related {str(hit['timestamp'])[:16]}] {hit['sender']} re \"{hit['subject']}\": {hit['summary']}"
+            for hit in reversed(hits)
+        ]
 
-    def _format_logs(self, logs) -> str:
-        history_text = [
+    async def record(self, user_email: str, log: dict):
+        # Folds a newly stored summary into its thread's digest and the retrieval index.
+        # Best effort: the log is already stored, so raising would only make the redelivered
+        # event skip the message as a duplicate without repairing anything
+        if self.vector_store and log.get('summary') and not is_error_summary(log['summary']):
+            try:
+                await asyncio.to_thread(self.vector_store.add, user_email, f"{log['subject']}\n{log['summary']}", {
+                    "message_id": log['message_id'], "thread_id": log['thread_id'],
+                    "sender": log['sender'], "subject": log['subject'],
+                    "timestamp": log['timestamp'], "summary": log['summary'][:500],
+                })
+            except Exception as e:
+                print(f"   [ContextEngine Error]: Index update failed: {e}")
+
+        # O(1) regardless of thread length
+        if not self.digest_repo or not log.get('thread_id'): return
+        try:
+            for _ in range(DIGEST_SAVE_ATTEMPTS):
+                digest = await self.digest_repo.get_digest(user_email, log['thread_id'])
+                if digest is None:
+                    logs = await self.email_repo.get_thread_logs(log['thread_id'], limit=100, latest=True)
+                    digest = self.digester.build(user_email, log['thread_id'], logs)
+                else:
+                    self.digester.add(digest, log)
+                if await self.digest_repo.save_digest(digest):
+                    return
+            raise RuntimeError(f"Digest for thread {log['thread_id']} kept changing during the update")
+        except Exception as e:
+            print(f"   [ContextEngine Error]: Digest update failed: {e}")
+
+    async def _bootstrap_digest(self, user_email, thread_id, logs):
+        # First context read for a thread without a digest: build one from the logs we already loaded
+        if not self.digest_repo or not logs: return None
+        try:
+            digest = self.digester.build(user_email, thread_id, logs)
+            # Losing the race to a concurrent writer is fine: its digest covers the same logs
+            await self.digest_repo.save_digest(digest)
+            return self.digester.format(digest)
+        except Exception as e:
+            print(f"   [ContextEngine Error]: Digest bootstrap failed: {e}")
+            return None
+
+    def _format_logs(self, logs) -> list:
+        return [
             f"[{log['timestamp'].strftime('%Y-%m-%d %H:%M')}] {log['sender']} said: {log['summary']}"
             for log in logs
-        ]
-        return "\n".join(history_text) if history_text else "No previous context available."
\ No newline at end of file
+        ]
\ No newline at end of file
@@ -1,7 +1,11 @@
 import os
 import json
 import asyncio
+import signal
 import sys
+import threading
+import uuid
+from functools import partial
 from dotenv import load_dotenv
 
 # --- 1. LOAD ENV FIRST ---
@@ -17,37 +21,138 @@ if not PROJECT_ID:
     sys.exit(1)
 
 # --- 3. IMPORTS ---
+from google.api_core.exceptions import AlreadyExists, NotFound
 from google.cloud import pubsub_v1
 from google.oauth2 import service_account
 from common.database import db
 from common.user_repository import MongoUserRepository
 from common.email_repository import MongoEmailRepository
+from common.gmail_client import AsyncGmailClient
+from common.lease_repository import MongoLeaseRepository
+from common.ai_factory import AIFactory
+from common.summary_cache_repository import MongoSummaryCacheRepository
+from common.thread_digest_repository import MongoThreadDigestRepository
 from services.event_processor.processor import EmailProcessor
+from services.event_processor.coalescer import NotificationCoalescer
+from services.event_processor.worker import WorkerPool
+from services.event_processor.sharding import ShardMembership
+from core.processor_config import settings
 
 SUB_NAME = f"projects/{PROJECT_ID}/subscriptions/gmail-events-sub"
+FORWARD_TOPIC = f"projects/{PROJECT_ID}/topics/{settings.shard_forward_topic}"
 MAIN_LOOP = None
 processor = None
+coalescer = None
+sharding = None
+publisher = None
+DRAINING = False
 
-def callback(message):
+# Pub/Sub messages whose sync has not finished yet, so shutdown can wait for or nack them
+IN_FLIGHT = set()
+IN_FLIGHT_LOCK = threading.Lock()
+
+def settle(message, future):
+    # Runs once the sync covering this notification has finished: ack on success, nack to redeliver.
+    # The processor only raises retryable failures; permanent ones (unknown or inactive user,
+    # revoked refresh token) return normally so they are acked rather than redelivered forever.
+    with IN_FLIGHT_LOCK:
+        IN_FLIGHT.discard(future)
+    if future.cancelled() or future.exception():
+        print(f"[Event Failed] Message {message.message_id} will be redelivered.", file=sys.stderr)
+        message.nack()
+    else:
+        message.ack()
+
+def callback(message, forwarded=False):
     try:
         data = json.loads(message.data.decode('utf-8'))
         email_address = data.get('emailAddress')
         history_id = data.get('historyId')
-        
-        print(f"[Event Received] For: {email_address}")
-        
-        if MAIN_LOOP and not MAIN_LOOP.is_closed() and processor:
-            asyncio.run_coroutine_threadsafe(
-                processor.process_event(email_address, history_id), 
-                MAIN_LOOP
-            )
+        if not email_address or not history_id:
+            raise ValueError(f"Notification without emailAddress/historyId: {data}")
     except Exception as e:
+        # A payload we cannot parse will never succeed, so do not redeliver it
         print(f"Error in Pub/Sub callback: {e}", file=sys.stderr)
-    finally:
         message.ack()
+        return
+
+    # While draining, hand new work straight back so another replica picks it up
+    if DRAINING or not (MAIN_LOOP and not MAIN_LOOP.is_closed() and coalescer):
+        message.nack()
+        return
+
+    # Not ours on the ring: hand it to the owner directly rather than nacking it back into the
+    # shared subscription. Forwarded events are processed as-is, so a ring change mid-flight
+    # costs at most one extra hop; the claimed history range keeps a stray sync safe.
+    if sharding and not forwarded:
+        owner = sharding.owner(email_address)
+        if owner != sharding.replica_id:
+            forward(message, owner)
+            return
+
+    print(f"[Event Received] For: {email_address}")
+
+    future = asyncio.run_coroutine_threadsafe(
+        coalescer.submit(email_address, history_id),
+        MAIN_LOOP
+    )
+    with IN_FLIGHT_LOCK:
+        IN_FLIGHT.add(future)
+    future.add_done_callback(partial(settle, message))
+
+def forward(message, owner):
+    # Only the owner's filtered subscription receives it; ack the original once the publish lands
+    try:
+        published = publisher.publish(FORWARD_TOPIC, message.data, replica=owner)
+    except Exception as e:
+        print(f"[Forward Failed] Message {message.message_id} to {owner}: {e}", file=sys.stderr)
+        message.nack()
+        return
+    published.add_done_callback(lambda f: message.nack() if f.exception() else message.ack())
+
+def create_replica_subscription(subscriber, replica_id):
+    # A notification lost with a dead replica's subscription is recovered by the user's next
+    # one, which syncs from the stored cursor; the TTL cleans up subscriptions left behind
+    name = f"projects/{PROJECT_ID}/subscriptions/{settings.shard_forward_topic}-{replica_id}"
+    try:
+        subscriber.create_subscription(request={
+            "name": name,
+            "topic": FORWARD_TOPIC,
+            "filter": f'attributes.replica = "{replica_id}"',
+            "expiration_policy": {"ttl": {"seconds": 24 * 60 * 60}},
+        })
+    except AlreadyExists:
+        pass
+    return name
+
+async def drain(pool, timeout):
+    """
+    Stops taking new events, waits up to `timeout` seconds for in-flight ones,
+    then nacks whatever is left and stops the workers.
+    """
+    global DRAINING
+    DRAINING = True
+    coalescer.flush_now()
+
+    with IN_FLIGHT_LOCK:
+        pending = list(IN_FLIGHT)
+    print(f"Draining {len(pending)} in-flight event(s) (up to {timeout}s)...")
+    if pending:
+        await asyncio.wait([asyncio.wrap_future(f) for f in pending], timeout=timeout)
+
+    with IN_FLIGHT_LOCK:
+        leftovers = list(IN_FLIGHT)
+    for future in leftovers:
+        # Cancelling runs settle(), which nacks the message for redelivery
+        future.cancel()
+    if leftovers:
+        print(f"Drain deadline reached, nacked {len(leftovers)} event(s).")
+
+    # Any sync still running is cancelled and releases its claimed history range
+    await pool.stop()
 
 async def main():
-    global MAIN_LOOP, processor
+    global MAIN_LOOP, processor, coalescer, sharding, publisher
     MAIN_LOOP = asyncio.get_running_loop()
     
     db.connect()
@@ -55,23 +160,85 @@ async def main():
     # --- Initialize Repositories and Processor ---
     user_repo = MongoUserRepository(db.get_db())
     email_repo = MongoEmailRepository(db.get_db())
-    processor = EmailProcessor(user_repo, email_repo)
+    summary_cache_repo = MongoSummaryCacheRepository(db.get_db())
+    await summary_cache_repo.ensure_indexes()
+    digest_repo = MongoThreadDigestRepository(db.get_db())
+    processor = EmailProcessor(user_repo, email_repo, summary_cache_repo, digest_repo)
+
+    # Coalesced syncs go through a bounded queue drained by a fixed worker pool
+    pool = WorkerPool(processor.process_event, settings.worker_concurrency, settings.work_queue_size)
+    pool.start()
+    processor.model_ladder.queue_depth = lambda: pool.queue_depth
+    coalescer = NotificationCoalescer(pool.run, settings.coalesce_window_seconds)
+
+    if settings.sharding_enabled:
+        # HOSTNAME is the pod name under Kubernetes, which is stable for the pod's lifetime
+        replica_id = os.getenv("HOSTNAME") or uuid.uuid4().hex
+        sharding = ShardMembership(
+            MongoLeaseRepository(db.get_db()), replica_id,
+            settings.shard_lease_ttl_seconds, settings.shard_virtual_nodes
+        )
+        await sharding.start()
 
     creds = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE)
     subscriber = pubsub_v1.SubscriberClient(credentials=creds)
     
     print(f"Listening on subscription: {SUB_NAME}...")
     
-    future = subscriber.subscribe(SUB_NAME, callback=callback)
-    
+    # Messages stay outstanding until processed, so this caps in-flight events
+    flow_control = pubsub_v1.types.FlowControl(
+        max_messages=settings.pubsub_max_outstanding_messages,
+        max_bytes=settings.pubsub_max_outstanding_bytes,
+    )
+
+    # The forwarding side must exist before the shared subscription starts delivering, or the
+    # first foreign notification would be forwarded through a publisher that is not there yet
+    forward_sub, forward_future = None, None
+    if sharding:
+        publisher = pubsub_v1.PublisherClient(credentials=creds)
+        forward_sub = create_replica_subscription(subscriber, sharding.replica_id)
+        forward_future = subscriber.subscribe(
+            forward_sub, callback=partial(callback, forwarded=True), flow_control=flow_control
+        )
+    future = subscriber.subscribe(SUB_NAME, callback=callback, flow_control=flow_control)
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            MAIN_LOOP.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Windows: fall back to KeyboardInterrupt
+
     try:
-        while True:
-            await asyncio.sleep(1)
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.stats_log_interval_seconds)
+            except asyncio.TimeoutError:
+                print(f"[Stats] {coalescer.stats()} {pool.snapshot()} {processor.summary_batcher.stats()} {AIFactory.stats()} "
+                      f"{processor.single_flight.stats()} {processor.model_ladder.stats()} "
+                      f"{processor.triage.counts if processor.triage else ''} {sharding.stats() if sharding else ''}")
+        print("Shutdown signal received...")
+        if sharding:
+            # Release our lease first so the other replicas take over our mailboxes
+            await sharding.stop()
+        await drain(pool, settings.shutdown_drain_timeout_seconds)
     except asyncio.CancelledError:
         print("Shutdown signal received...")
     finally:
+        # Subscriber stays open during the drain so acks and nacks still reach Pub/Sub
         future.cancel()
+        if forward_future:
+            forward_future.cancel()
+            try:
+                subscriber.delete_subscription(request={"subscription": forward_sub})
+            except NotFound:
+                pass
+        if publisher:
+            publisher.stop()
         subscriber.close()
+        await pool.stop()
+        await processor.close()
+        await AsyncGmailClient.close_shared_http()
         db.close()
         print("Service shut down gracefully.")
 
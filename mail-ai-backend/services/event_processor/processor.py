@@ -1,15 +1,28 @@
 import os
+import uuid
 import asyncio
 from datetime import datetime
 from collections import deque
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from common.models import EmailLog
 from common.ai_factory import AIFactory
-from common.interfaces import IUserRepository, IEmailRepository
+from common.summary_batcher import SummaryBatcher
+from common.summary_cache import SummaryCache
+from common.email_triage import EmailTriage, TIER_FULL, TIER_SKIP
+from common.single_flight import SingleFlight
+from common.model_ladder import ModelLadder
+from common.ai_router import AIRouter
+from common.credential_manager import CredentialManager, TokenRefreshError
+from common.gmail_client import AsyncGmailClient, GmailApiError
+from common.gmail_service_cache import GmailServiceCache
+from common.gmail_sync import GmailSyncEngine
+from common.gmail_batch import GmailBatchFetcher
+from common.prompt_budget import PromptBudgeter
+from common.vector_index import VectorIndexStore
+from common.interfaces import IUserRepository, IEmailRepository, ISummaryCacheRepository, IThreadDigestRepository
 from services.event_processor.context_engine import ContextEngine
 from services.event_processor.prompt_builder import PromptBuilder
+from services.event_processor.thread_digest import ThreadDigester
+from core.processor_config import settings
 
 class LocalHistory:
     def __init__(self, max_size=1000):
@@ -18,12 +31,49 @@ class LocalHistory:
     def add(self, message_id): self._seen_ids.append(message_id)
 
 class EmailProcessor:
-    def __init__(self, user_repo: IUserRepository, email_repo: IEmailRepository):
+    def __init__(self, user_repo: IUserRepository, email_repo: IEmailRepository,
+                 summary_cache_repo: ISummaryCacheRepository = None, digest_repo: IThreadDigestRepository = None):
         self.user_repo = user_repo
         self.email_repo = email_repo
         self.history = LocalHistory()
-        self.context_engine = ContextEngine(email_repo)
-        self.prompt_builder = PromptBuilder()
+        vector_store = None
+        if settings.vector_index_enabled:
+            vector_store = VectorIndexStore(settings.vector_index_dir, settings.vector_index_dim)
+        self.context_engine = ContextEngine(
+            email_repo, digest_repo if settings.thread_digest_enabled else None,
+            ThreadDigester(recent_size=settings.thread_digest_recent_entries), vector_store
+        )
+        self.prompt_builder = PromptBuilder(PromptBudgeter(settings.prompt_max_input_tokens))
+        self.sync_engine = GmailSyncEngine()
+        self.batch_fetcher = GmailBatchFetcher()
+        self.gmail_clients = GmailServiceCache()
+        self.credentials = CredentialManager(os.getenv("GOOGLE_CLIENT_ID"), os.getenv("GOOGLE_CLIENT_SECRET"))
+        summary_cache = None
+        if settings.summary_cache_enabled:
+            summary_cache = SummaryCache(
+                summary_cache_repo, settings.summary_cache_max_entries, settings.summary_cache_ttl_seconds
+            )
+        router = None
+        if settings.ai_routing_enabled:
+            router = AIRouter(
+                settings.ai_failover_providers,
+                failure_threshold=settings.ai_circuit_failure_threshold,
+                cooldown_seconds=settings.ai_circuit_cooldown_seconds,
+                attempt_timeout_seconds=settings.ai_attempt_timeout_seconds,
+                slow_factor=settings.ai_slow_provider_factor,
+                hedge_percentiles=settings.ai_hedge_percentiles,
+                hedge_budget_ratio=settings.ai_hedge_budget_ratio,
+                hedge_min_samples=settings.ai_hedge_min_samples
+            )
+        self.summary_batcher = SummaryBatcher(
+            settings.summary_batch_max_size, settings.summary_batch_max_wait_seconds, summary_cache, router
+        )
+        self.single_flight = SingleFlight()
+        # queue_depth is attached by the service once its worker pool exists
+        self.model_ladder = ModelLadder(
+            settings.ai_model_ladders, settings.ai_model_token_steps, settings.ai_model_backlog_queue_depth
+        )
+        self.triage = EmailTriage(settings.triage_classifier_threshold) if settings.triage_enabled else None
 
     async def process_event(self, email_address, history_id):
         try:
@@ -32,72 +82,242 @@ class EmailProcessor:
                 if user: print(f"[Ignored] User {email_address} is INACTIVE.")
                 return
 
-            creds = Credentials(
-                None, refresh_token=user['refresh_token'],
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=os.getenv("GOOGLE_CLIENT_ID"),
-                client_secret=os.getenv("GOOGLE_CLIENT_SECRET")
-            )
-            if not creds.valid: creds.refresh(Request())
-            service = build('gmail', 'v1', credentials=creds)
+            claim = await self._claim_history_range(email_address, user.get('last_history_id'), history_id)
+            if not claim:
+                return
+            start_history_id, owner = claim
+
+            try:
+                await self._sync_and_process(user, start_history_id, history_id)
+            except (Exception, asyncio.CancelledError) as e:
+                # The cursor never moved; drop the claim so the redelivered notification retries right away
+                self._invalidate_credentials(email_address, e)
+                await self.user_repo.release_sync_claim(email_address, owner)
+                if isinstance(e, TokenRefreshError) and e.permanent:
+                    # Redelivery cannot help until the user signs in again; stop watching and let the event be acked
+                    await self._deactivate_revoked_user(email_address, e)
+                    return
+                raise
+
+            if not await self.user_repo.commit_sync_cursor(email_address, owner, history_id):
+                # Our lease expired mid-sync and another worker re-claimed the range; it will finish it
+                print(f"[Warning] Sync claim for {email_address} expired before commit.")
+
+        except Exception as e:
+            print(f"PROCESSOR ERROR: {e}")
+            raise
+
+    async def _sync_and_process(self, user, start_history_id, history_id):
+        email_address = user['email']
+        gmail = await self._get_gmail_client(user)
+
+        messages, _ = await self.sync_engine.sync(gmail, start_history_id, history_id)
+
+        pending = []
+        for ref in messages:
+            if self.history.is_seen(ref['id']) or await self.email_repo.get_email_log_by_message_id(ref['id']):
+                self.history.add(ref['id'])
+                continue
+            pending.append(ref)
+        if not pending: return
+
+        print(f"[Sync] {len(pending)} new message(s) for {email_address}")
+
+        # One batched round trip for all new messages and the threads they need; messages deleted
+        # since they were listed are left out (and skipped), any other fetch failure fails the event
+        full_messages = await self.batch_fetcher.get_messages(gmail, [ref['id'] for ref in pending])
+        gone = [ref['id'] for ref in pending if ref['id'] not in full_messages]
+        if gone:
+            print(f"[Skipping] {len(gone)} message(s) for {email_address} no longer exist")
+
+        # Triage first: only threads with a message that gets a full summary need their context
+        triaged = {
+            msg_id: self._classify(msg) for msg_id, msg in full_messages.items()
+            if 'DRAFT' not in msg.get('labelIds', [])
+        }
+        user_depth = user.get('settings', {}).get('context_depth', 10)
+        threads = await self.context_engine.prefetch_threads(
+            gmail, [ref['threadId'] for ref in pending if triaged.get(ref['id'], (None,))[0] == TIER_FULL],
+            limit=user_depth, user_email=email_address
+        )
+
+        # Threads run concurrently so their summaries can share one LLM request;
+        # messages within a thread stay in order so each sees the previous one's log
+        by_thread = {}
+        for ref in pending:
+            if ref['id'] in full_messages:
+                by_thread.setdefault(ref['threadId'], []).append(full_messages[ref['id']])
+
+        async def process_thread(thread_id, msgs):
+            for msg in msgs:
+                await self._process_message(gmail, user, msg, threads.get(thread_id), triaged.get(msg['id']))
+
+        # Let every thread finish before failing the event, so a retry only redoes unsaved messages
+        results = await asyncio.gather(*(process_thread(t, msgs) for t, msgs in by_thread.items()),
+                                       return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+
+    async def _get_gmail_client(self, user):
+        # Ask the credential manager on every event (a memory hit) so it sees the user as active
+        # and refreshes the token in the background; rebuild the client whenever the token changed
+        token, expiry = await self.credentials.get_access_token(user['email'], user['refresh_token'])
+        gmail = self.gmail_clients.get(user['email'])
+        if gmail and gmail.access_token == token: return gmail
+
+        gmail = AsyncGmailClient(token)
+        self.gmail_clients.put(user['email'], gmail, expiry)
+        return gmail
+
+    def _classify(self, msg):
+        # (tier, kind) for a full Gmail message; everything is a full summary with triage off
+        if not self.triage: return TIER_FULL, None
+        headers = msg['payload']['headers']
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown")
+        return self.triage.classify(headers, msg.get('labelIds', []), sender, subject, msg.get('snippet', ''))
+
+    def _invalidate_credentials(self, email_address, error):
+        # A revoked or expired token would otherwise keep failing every event until it ages out
+        if isinstance(error, GmailApiError) and error.status == 401:
+            print(f"[Auth] Gmail rejected the token for {email_address}; dropping cached credentials.")
+            self.credentials.invalidate(email_address)
+            self.gmail_clients.invalidate(email_address)
 
-            results = service.users().messages().list(userId='me', maxResults=1).execute()
-            if not results.get('messages', []): return
-            
-            msg_id = results['messages'][0]['id']
-            thread_id = results['messages'][0]['threadId']
+    async def _deactivate_revoked_user(self, email_address, error):
+        print(f"[Auth] Refresh token for {email_address} no longer works; deactivating until they sign in again. ({error})")
+        await self.user_repo.create_or_update_user({
+            'email': email_address, 'is_active': False, 'watch_status': "Revoked (sign in again)"
+        })
 
-            msg_meta = service.users().messages().get(userId='me', id=msg_id, format='minimal').execute()
-            internal_date = int(msg_meta['internalDate']) / 1000
+    async def close(self):
+        await self.credentials.close()
+        if self.context_engine.vector_store:
+            self.context_engine.vector_store.close()
+
+    async def _claim_history_range(self, email_address, start_history_id, end_history_id):
+        # Returns (start, claim owner) if this worker should sync start..end, None if nothing is left to do.
+        # The cursor only moves on commit, so a failed or killed sync never skips history
+        if not end_history_id:
+            return None
+        for _ in range(3):
+            if start_history_id and int(end_history_id) <= int(start_history_id):
+                print(f"[Ignored] History {end_history_id} already synced for {email_address}.")
+                return None
+            owner = uuid.uuid4().hex
+            if await self.user_repo.claim_sync_range(
+                    email_address, start_history_id, end_history_id, owner, settings.sync_claim_lease_seconds):
+                return start_history_id, owner
+
+            user = await self.user_repo.get_user_by_email(email_address) or {}
+            claim = user.get('sync_claim')
+            if user.get('last_history_id') == start_history_id and claim:
+                if int(claim['end_history_id']) >= int(end_history_id):
+                    print(f"[Ignored] History up to {end_history_id} is being synced for {email_address}.")
+                    return None
+                # Another worker is syncing an older range; fail so Pub/Sub redelivers this one later
+                raise RuntimeError(f"Sync for {email_address} in progress up to {claim['end_history_id']}")
+            start_history_id = user.get('last_history_id')
+        raise RuntimeError(f"Could not claim history range for {email_address}")
+
+    async def _process_message(self, gmail, user, msg, thread_data=None, triaged=None):
+        email_address = user['email']
+        msg_id = msg['id']
+        try:
+            internal_date = int(msg['internalDate']) / 1000
             email_time = datetime.fromtimestamp(internal_date)
-            
+
             last_started = user.get('last_started_at')
             if last_started and email_time < last_started:
                 print(f"[Skipping] Old email from {email_time}")
                 return
 
-            if self.history.is_seen(msg_id) or await self.email_repo.get_email_log_by_message_id(msg_id):
-                self.history.add(msg_id)
-                return
-
-            msg = service.users().messages().get(userId='me', id=msg_id).execute()
             if 'DRAFT' in msg.get('labelIds', []): return
 
-            direction = "outbound" if 'SENT' in msg.get('labelIds', []) else "inbound"
-            headers = msg['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown")
-            snippet = msg.get('snippet', '')
-
-            print(f"Processing Mail from: {sender} (Thread: {thread_id})")
-
-            user_depth = user.get('settings', {}).get('context_depth', 10)
-            context_str = await self.context_engine.get_thread_context(
-                thread_id=thread_id,
-                gmail_service=service,
-                user_email=email_address,
-                current_message_id=msg_id,
-                limit=user_depth
+            # Concurrent notifications for the same message share one summarization
+            _, shared = await self.single_flight.do(
+                (email_address, msg_id),
+                lambda: self._summarize_and_save(gmail, user, msg, email_time, thread_data, triaged)
             )
-        
-            final_prompt = self.prompt_builder.build(context_str=context_str, email_content=snippet)
+            if shared:
+                print(f"[Deduplicated] {msg_id} already being summarized for {email_address}")
 
-            try:
-                ai_provider = user.get('settings', {}).get('ai_provider', 'gemini')
-                ai_service = AIFactory.get_service(ai_provider)
-                summary = ai_service.summarize(final_prompt, "Context-Aware Summary")
-            except Exception as e:
-                summary = f"[AI ERROR]: {e}"
-
-            log_entry = EmailLog(
-                user_email=email_address, message_id=msg_id, thread_id=thread_id,
-                sender=sender, subject=subject, summary=summary,
-                ai_provider=ai_provider, timestamp=email_time, direction=direction
-            )
-            
-            await self.email_repo.insert_email_logs([log_entry.dict()])
-            self.history.add(msg_id)
-            print(f"SUCCESS: Saved Context-Aware Summary for {email_address}")
+        except Exception as e:
+            # Fail the event so Pub/Sub redelivers it; already-saved messages are skipped on retry
+            print(f"PROCESSOR ERROR ({msg_id}): {e}")
+            raise
+
+    async def _summarize_and_save(self, gmail, user, msg, email_time, thread_data=None, triaged=None):
+        email_address = user['email']
+        msg_id = msg['id']
+        thread_id = msg['threadId']
+        if self.history.is_seen(msg_id): return  # Finished by a call that just left the single-flight
 
+        direction = "outbound" if 'SENT' in msg.get('labelIds', []) else "inbound"
+        headers = msg['payload']['headers']
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown")
+        snippet = msg.get('snippet', '')
+
+        print(f"Processing Mail from: {sender} (Thread: {thread_id})")
+
+        ai_provider = user.get('settings', {}).get('ai_provider', 'gemini')
+        tier, kind = triaged or self._classify(msg)
+        if tier != TIER_FULL:
+            # Automated mail: no thread context, no LLM call
+            summary = self.triage.template_summary(kind, sender, subject, snippet) if tier != TIER_SKIP else ""
+            await self._save_log(email_address, msg_id, thread_id, sender, subject, summary,
+                                 ai_provider, None, email_time, direction, tier)
+            return
+
+        user_depth = user.get('settings', {}).get('context_depth', 10)
+        context_entries = await self.context_engine.get_thread_context(
+            thread_id=thread_id,
+            gmail_client=gmail,
+            user_email=email_address,
+            current_message_id=msg_id,
+            limit=user_depth,
+            thread_data=thread_data
+        )
+        # Relevant summaries from other threads and senders; the budgeter trims these before thread context
+        related_entries = await self.context_engine.related_context(
+            email_address, f"{subject}\n{snippet}", thread_id, settings.context_retrieval_top_k
+        )
+
+        allowed_providers = user.get('settings', {}).get('allowed_providers')
+        ai_model = None
+        try:
+            # Budget the prompt in the target model's tokens
+            model = AIFactory.get_service(ai_provider).model_name
+            final_prompt = self.prompt_builder.build(related_entries + context_entries, snippet, model)
+            # Larger models only for long or IMPORTANT mail, faster ones under backlog
+            ladder_model = self.model_ladder.select(
+                ai_provider, self.prompt_builder.budgeter.count_tokens(final_prompt, model),
+                'IMPORTANT' in msg.get('labelIds', [])
+            )
+            ai_model = ladder_model or model
+            # Record whichever provider and model answered, which differ from the preferred ones after failover
+            summary, ai_provider, ai_model = await self.summary_batcher.summarize(
+                email_address, ai_provider, final_prompt, "Context-Aware Summary", allowed_providers, ladder_model
+            )
         except Exception as e:
-            print(f"PROCESSOR ERROR: {e}")
\ No newline at end of file
+            summary = f"[AI ERROR]: {e}"
+
+        await self._save_log(email_address, msg_id, thread_id, sender, subject, summary,
+                             ai_provider, ai_model, email_time, direction, tier)
+
+    async def _save_log(self, email_address, msg_id, thread_id, sender, subject, summary,
+                        ai_provider, ai_model, email_time, direction, tier):
+        log_entry = EmailLog(
+            user_email=email_address, message_id=msg_id, thread_id=thread_id,
+            sender=sender, subject=subject, summary=summary, ai_provider=ai_provider,
+            ai_model=ai_model, timestamp=email_time, direction=direction, tier=tier
+        )
+
+        await self.email_repo.insert_email_logs([log_entry.dict()])
+        if tier != TIER_SKIP:
+            # Skipped mail has no summary worth retrieving as context later
+            await self.context_engine.record(email_address, log_entry.dict())
+        self.history.add(msg_id)
+        print(f"SUCCESS: Saved {tier} summary for {email_address}")
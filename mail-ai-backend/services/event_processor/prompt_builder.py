@@ -1,4 +1,5 @@
 import os
+from common.prompt_budget import PromptBudgeter
 
 class PromptBuilder:
     # A safe default just in case .env is missing
@@ -15,17 +16,18 @@ class PromptBuilder:
     Summarize the new email. If it refers to the context, explain the connection.
     """
 
-    def __init__(self):
+    def __init__(self, budgeter: PromptBudgeter = None):
         # We load the template once when the class is initialized
         self.template = os.getenv("CONTEXT_AWARE_PROMPT", self.DEFAULT_TEMPLATE)
+        self.budgeter = budgeter or PromptBudgeter()
 
-    def build(self, context_str: str, email_content: str) -> str:
+    def build(self, context_entries, email_content: str, model: str = "") -> str:
         """
         Combines history + new email into the final prompt string.
+        The email is kept whole where possible; context is trimmed oldest-first to fit the token budget.
         """
-        # If no context exists, we can provide a friendly placeholder
-        clean_context = context_str if context_str else "No previous conversation history."
-        
+        email_content, clean_context = self.budgeter.fit(self.template, email_content, context_entries, model)
+
         try:
             # Inject the data into the template
             return self.template.format(
@@ -0,0 +1,101 @@
+import asyncio
+import bisect
+import hashlib
+from common.interfaces import ILeaseRepository
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping email addresses to replica IDs.
+
+    Each member is placed at `virtual_nodes` points on the ring so that adding
+    or removing a replica only moves about 1/N of the mailboxes.
+    """
+
+    def __init__(self, members, virtual_nodes: int = 64):
+        self.members = tuple(sorted(members))
+        points = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(virtual_nodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, key):
+        if not self._hashes or not key:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key.lower())) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardMembership:
+    """
+    Keeps this replica's lease alive and the ring in sync with live replicas.
+
+    Replicas heartbeat into the lease collection every `lease_ttl_seconds / 3`
+    and rebuild the ring whenever the set of live leases changes. Until the
+    first membership read completes, this replica treats every mailbox as its
+    own so nothing stalls at startup.
+    """
+
+    def __init__(self, lease_repo: ILeaseRepository, replica_id, lease_ttl_seconds: int = 30,
+                 virtual_nodes: int = 64):
+        self.replica_id = replica_id
+        self._lease_repo = lease_repo
+        self._ttl = lease_ttl_seconds
+        self._virtual_nodes = virtual_nodes
+        self._ring = HashRing([replica_id], virtual_nodes)
+        self._task = None
+        self.owned_events = 0
+        self.forwarded_events = 0
+
+    async def start(self):
+        await self._heartbeat()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._lease_repo.release_lease(self.replica_id)
+
+    def owner(self, email_address):
+        # Read from the Pub/Sub callback thread; the ring is swapped atomically
+        owner = self._ring.owner(email_address)
+        if owner is None or owner == self.replica_id:
+            self.owned_events += 1
+            return self.replica_id
+        self.forwarded_events += 1
+        return owner
+
+    def stats(self):
+        return {
+            "replica_id": self.replica_id,
+            "replicas": len(self._ring.members),
+            "owned_events": self.owned_events,
+            "forwarded_events": self.forwarded_events,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._ttl / 3)
+            try:
+                await self._heartbeat()
+            except Exception as e:
+                print(f"[Sharding Error]: Heartbeat failed: {e}")
+
+    async def _heartbeat(self):
+        await self._lease_repo.renew_lease(self.replica_id, self._ttl)
+        members = await self._lease_repo.get_live_members()
+        if self.replica_id not in members:
+            members.append(self.replica_id)
+
+        if tuple(sorted(members)) != self._ring.members:
+            print(f"[Sharding] Rebalanced ring: {len(members)} replica(s) {sorted(members)}")
+            self._ring = HashRing(members, self._virtual_nodes)
@@ -0,0 +1,117 @@
+import re
+from datetime import datetime
+from common.ai_factory import is_error_summary
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_ACTION_WORDS = re.compile(
+    r"\b(please|deadline|due|asap|urgent|confirm|approve|agreed|decided|action|need|must|schedule|meeting|invoice|payment)\b",
+    re.IGNORECASE,
+)
+
+
+class ThreadDigester:
+    """
+    Maintains a compact, extractive digest per thread in O(1) per message.
+
+    The digest document holds the last `recent_size` entries verbatim plus up
+    to `max_points` key sentences extracted from older entries. When a new
+    entry pushes the oldest recent entry out, that entry's sentences are
+    scored and merged into the key points, so the cost of an update and the
+    size of the prompt context do not grow with thread length.
+    """
+
+    def __init__(self, recent_size: int = 3, max_points: int = 6, max_participants: int = 8,
+                 recency_decay: float = 0.9):
+        self.recent_size = recent_size
+        self.max_points = max_points
+        self.max_participants = max_participants
+        self.recency_decay = recency_decay
+
+    def new_digest(self, user_email, thread_id):
+        return {
+            "user_email": user_email,
+            "thread_id": thread_id,
+            "message_count": 0,
+            "folded_count": 0,
+            "participants": [],
+            "first_at": None,
+            "last_at": None,
+            "key_points": [],
+            "recent": [],
+        }
+
+    def add(self, digest, log):
+        # log: dict with message_id, timestamp, sender, summary (an EmailLog dict)
+        if is_error_summary(log.get('summary', '')):
+            return digest  # A failed summarization says nothing about the thread
+        message_id = log.get('message_id')
+        if message_id and any(e.get("message_id") == message_id for e in digest["recent"]):
+            return digest  # Already folded in, e.g. by a digest another writer built from the same logs
+        timestamp = log.get('timestamp') or datetime.utcnow()
+        digest["message_count"] += 1
+        digest["first_at"] = digest["first_at"] or timestamp
+        digest["last_at"] = timestamp
+
+        sender = log.get('sender', 'Unknown')
+        if sender not in digest["participants"] and len(digest["participants"]) < self.max_participants:
+            digest["participants"].append(sender)
+
+        digest["recent"].append({
+            "message_id": message_id, "timestamp": timestamp, "sender": sender, "summary": log.get('summary', '')
+        })
+        while len(digest["recent"]) > self.recent_size:
+            self._fold(digest, digest["recent"].pop(0))
+        return digest
+
+    def build(self, user_email, thread_id, logs):
+        # Bootstraps a digest from existing logs (oldest first), e.g. for threads that predate digests
+        digest = self.new_digest(user_email, thread_id)
+        for log in logs:
+            self.add(digest, log)
+        return digest
+
+    def format(self, digest):
+        entries = []
+        if digest["key_points"] or digest["folded_count"]:
+            points = "; ".join(p["text"] for p in sorted(digest["key_points"], key=lambda p: p["seq"]))
+            span = ""
+            if digest["first_at"]:
+                span = f" since {digest['first_at'].strftime('%Y-%m-%d')}"
+            entries.append(
+                f"[Thread digest] {digest['folded_count']} earlier message(s){span} between "
+                f"{', '.join(digest['participants'])}. Key points: {points or 'none recorded'}"
+            )
+        entries.extend(
+            f"[{e['timestamp'].strftime('%Y-%m-%d %H:%M')}] {e['sender']} said: {e['summary']}"
+            for e in digest["recent"]
+        )
+        return entries
+
+    def _fold(self, digest, entry):
+        digest["folded_count"] += 1
+        seq = digest["folded_count"]
+        summary = entry.get("summary", "")
+        if not summary or is_error_summary(summary):
+            return
+        summary = summary.replace("[Backfilled] ", "", 1)
+
+        candidates = [
+            {"text": f"{entry['sender'].split('<')[0].strip()}: {s.strip()[:200]}", "score": self._score(s), "seq": seq}
+            for s in _SENTENCE_SPLIT.split(summary) if len(s.split()) >= 3
+        ]
+        # Older points decay so the digest follows the conversation as it moves on
+        points = digest["key_points"] + candidates
+        points.sort(key=lambda p: p["score"] * self.recency_decay ** (seq - p["seq"]), reverse=True)
+        digest["key_points"] = points[:self.max_points]
+
+    @staticmethod
+    def _score(sentence):
+        words = sentence.split()
+        score = min(len(words), 30) / 30
+        if any(ch.isdigit() for ch in sentence):
+            score += 0.5  # Dates, amounts, reference numbers
+        if _ACTION_WORDS.search(sentence):
+            score += 0.5
+        if sentence.strip().endswith("?"):
+            score += 0.3  # Open questions
+        return score
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+
+class _Job:
+    def __init__(self, args, future):
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class WorkerPool:
+    """
+    Bounded asyncio work queue drained by a fixed number of worker tasks.
+
+    `run()` enqueues a call to `handler` and waits for its result, blocking
+    while the queue is full so producers feel backpressure. Queue depth, time
+    spent waiting in the queue and worker utilisation are tracked for sizing.
+    """
+
+    def __init__(self, handler, workers: int = 32, queue_size: int = 256):
+        # handler: async callable run by the workers with the args given to run()
+        self._handler = handler
+        self._num_workers = workers
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._busy_since = {}
+        self._window_started = time.monotonic()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._jobs_started = 0
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+
+    def start(self):
+        for i in range(self._num_workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def run(self, *args):
+        job = _Job(args, asyncio.get_running_loop().create_future())
+        await self._queue.put(job)
+        return await asyncio.shield(job.future)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    @property
+    def busy_workers(self):
+        return self._busy
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def snapshot(self):
+        """
+        Returns pool metrics for the interval since the previous snapshot
+        (wait times, utilisation) plus the current queue state, then starts
+        a new interval.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._window_started, 1e-9)
+        busy_seconds = self._busy_seconds + sum(now - started for started in self._busy_since.values())
+
+        stats = {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "workers": self._num_workers,
+            "busy_workers": self._busy,
+            "utilisation": round(busy_seconds / (elapsed * self._num_workers), 3),
+            "avg_wait_ms": round(self._wait_total / self._jobs_started * 1000, 1) if self._jobs_started else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+        }
+
+        self._window_started = now
+        self._busy_seconds = 0.0
+        self._busy_since = {worker_id: now for worker_id in self._busy_since}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._jobs_started = 0
+        return stats
+
+    async def _worker(self, worker_id):
+        while True:
+            job = await self._queue.get()
+            started = time.monotonic()
+            wait = started - job.enqueued_at
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._jobs_started += 1
+
+            self._busy += 1
+            self._busy_since[worker_id] = started
+            try:
+                result = await self._handler(*job.args)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                self.jobs_failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self.jobs_completed += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._busy -= 1
+                self._busy_seconds += time.monotonic() - self._busy_since.pop(worker_id)
+                self._queue.task_done()
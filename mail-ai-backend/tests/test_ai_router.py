@@ -0,0 +1,51 @@
+"""
+Failover stays within the configured providers, and simulated providers
+(local/fake) never fail over to real, paid ones.
+
+Run from mail-ai-backend/:
+    python -m pytest tests
+"""
+
+import asyncio
+import pytest
+from common.ai_router import AIRouter
+
+
+def test_provider_outside_failover_list_is_tried_alone():
+    router = AIRouter(["gemini", "openai"])
+    assert router.candidates("local") == ["local"]
+    assert router.candidates("fake", allowed=None) == ["fake"]
+
+
+def test_simulated_and_real_providers_never_mix():
+    router = AIRouter(["local", "fake", "gemini", "openai"])
+    assert router.candidates("local") == ["local", "fake"]
+    assert router.candidates("gemini") == ["gemini", "openai"]
+
+
+def test_failing_local_provider_does_not_reach_paid_providers():
+    router = AIRouter(["gemini", "openai"])
+    attempted = []
+
+    async def attempt(name):
+        attempted.append(name)
+        raise RuntimeError("500 Internal error (simulated)")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(router.call("local", None, attempt))
+    assert attempted == ["local"]
+    assert router.failovers == 0
+
+
+def test_real_providers_still_fail_over():
+    router = AIRouter(["gemini", "openai"])
+    attempted = []
+
+    async def attempt(name):
+        attempted.append(name)
+        if name == "gemini":
+            raise RuntimeError("503 Service unavailable")
+        return "summary"
+
+    assert asyncio.run(router.call("gemini", None, attempt)) == ("openai", "summary")
+    assert attempted == ["gemini", "openai"]
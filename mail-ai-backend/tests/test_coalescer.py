@@ -0,0 +1,38 @@
+"""
+Every caller of a coalesced sync gets an answer, even when the sync itself
+is cancelled, so no Pub/Sub message is left unsettled.
+
+Run from mail-ai-backend/:
+    python -m pytest tests
+"""
+
+import asyncio
+import pytest
+from services.event_processor.coalescer import NotificationCoalescer
+
+
+def test_notifications_share_one_sync():
+    dispatched = []
+
+    async def dispatch(email_address, history_id):
+        dispatched.append(history_id)
+        return history_id
+
+    async def run():
+        coalescer = NotificationCoalescer(dispatch, window_seconds=0.01)
+        return await asyncio.gather(coalescer.submit("a", "5"), coalescer.submit("a", "7"))
+
+    assert asyncio.run(run()) == ["7", "7"]
+    assert dispatched == ["7"]
+
+
+def test_cancelled_sync_cancels_its_waiters():
+    async def dispatch(email_address, history_id):
+        raise asyncio.CancelledError()
+
+    async def run():
+        coalescer = NotificationCoalescer(dispatch, window_seconds=0.01)
+        return await asyncio.wait_for(coalescer.submit("a", "5"), timeout=1)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
@@ -0,0 +1,61 @@
+"""
+CredentialManager keeps per-user state only for users that stay active, and
+marks refresh failures that no retry can fix as permanent.
+
+Run from mail-ai-backend/:
+    python -m pytest tests
+"""
+
+import asyncio
+import httpx
+import pytest
+from common.credential_manager import CredentialManager, TokenRefreshError
+from common.gmail_client import AsyncGmailClient
+
+
+def _manager(monkeypatch, status=200):
+    def token_endpoint(request):
+        if status != 200:
+            return httpx.Response(status, json={"error": "invalid_grant"})
+        return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+
+    monkeypatch.setattr(AsyncGmailClient, "_shared_http", httpx.AsyncClient(transport=httpx.MockTransport(token_endpoint)))
+    return CredentialManager("client", "secret")
+
+
+def _state(manager, email):
+    return [email in m for m in (manager._tokens, manager._refresh_tokens, manager._last_used,
+                                 manager._issued_at, manager._timers)]
+
+
+def test_idle_user_is_forgotten_and_active_user_kept(monkeypatch):
+    manager = _manager(monkeypatch)
+
+    async def run():
+        await manager.get_access_token("idle@example.com", "r1")
+        await manager.get_access_token("active@example.com", "r2")
+        # A token lifetime passes; only one user had events after their token was issued
+        manager._issued_at["idle@example.com"] = manager._last_used["idle@example.com"]
+        manager._last_used["idle@example.com"] = manager._issued_at["idle@example.com"].replace(year=2000)
+        manager._background_refresh("idle@example.com")
+        manager._background_refresh("active@example.com")
+        for _ in range(100):  # Let the background refresh run and schedule the next one
+            if "active@example.com" in manager._timers: break
+            await asyncio.sleep(0.01)
+        result = _state(manager, "idle@example.com"), _state(manager, "active@example.com")
+        await manager.close()
+        return result
+
+    idle, active = asyncio.run(run())
+    assert idle == [False] * 5
+    assert active == [True] * 5
+
+
+@pytest.mark.parametrize("status, permanent", [(400, True), (401, True), (503, False), (429, False)])
+def test_refresh_failure_is_classified_and_forgotten(monkeypatch, status, permanent):
+    manager = _manager(monkeypatch, status)
+
+    with pytest.raises(TokenRefreshError) as error:
+        asyncio.run(manager.get_access_token("user@example.com", "r"))
+    assert error.value.permanent is permanent
+    assert _state(manager, "user@example.com") == [False] * 5
@@ -0,0 +1,173 @@
+"""
+A message deleted between its history record and the fetch must not wedge
+the mailbox: it is skipped and the sync cursor still advances. Any other
+fetch failure fails the event so the range is retried.
+
+Run from mail-ai-backend/:
+    python -m pytest tests
+"""
+
+import asyncio
+import json
+import httpx
+import pytest
+from common.ai_factory import AIFactory
+from common.credential_manager import TokenRefreshError
+from common.gmail_batch import GmailBatchFetcher
+from common.gmail_client import AsyncGmailClient, GmailApiError, GMAIL_BASE_URL
+from core.processor_config import settings
+from services.email_processor.email_parser import EmailParser
+from services.event_processor.processor import EmailProcessor
+
+EMAIL = "user@example.com"
+
+
+def _message(message_id):
+    return {
+        "id": message_id, "threadId": f"thread-{message_id}", "labelIds": ["INBOX"],
+        "snippet": "Can we move the meeting to Thursday?", "internalDate": "1700000000000",
+        "payload": {"headers": [{"name": "From", "value": "bob@example.com"},
+                                {"name": "Subject", "value": "Meeting"}]},
+    }
+
+
+def _gmail(statuses):
+    # Gmail double: message IDs map to the status their fetch answers with (200 = exists)
+    def part(message_id, status):
+        body = json.dumps(_message(message_id) if status == 200 else {"error": {"code": status}})
+        return (f"--b\r\nContent-Type: application/http\r\nContent-ID: <response-{message_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n\r\n{body}\r\n")
+
+    def handler(request):
+        if request.url.path == "/batch/gmail/v1":
+            ids = [line.split("/messages/")[1].split("?")[0]
+                   for line in request.content.decode().splitlines() if line.startswith("GET ")]
+            content = "".join(part(i, statuses[i]) for i in ids) + "--b--\r\n"
+            return httpx.Response(200, headers={"Content-Type": "multipart/mixed; boundary=b"},
+                                  content=content.encode())
+        kind, item_id = request.url.path.split("/")[-2:]
+        if kind == "threads":
+            message_id = item_id[len("thread-"):]
+            return httpx.Response(200, json={"id": item_id, "messages": [_message(message_id)]})
+        status = statuses[item_id]
+        return httpx.Response(status, json=_message(item_id) if status == 200 else {})
+
+    http = httpx.AsyncClient(base_url=GMAIL_BASE_URL, transport=httpx.MockTransport(handler))
+    return AsyncGmailClient("token", http)
+
+
+class _UserRepo:
+    def __init__(self):
+        self.user = {"email": EMAIL, "is_active": True, "refresh_token": "r", "last_history_id": "100",
+                     "sync_claim": None, "settings": {"ai_provider": "local"}}
+
+    async def get_user_by_email(self, email):
+        return dict(self.user)
+
+    async def claim_sync_range(self, email, start, end, owner, lease_seconds):
+        if self.user["last_history_id"] != start or self.user["sync_claim"]:
+            return False
+        self.user["sync_claim"] = {"owner": owner, "end_history_id": end}
+        return True
+
+    async def commit_sync_cursor(self, email, owner, end):
+        self.user.update(last_history_id=end, sync_claim=None)
+        return True
+
+    async def release_sync_claim(self, email, owner):
+        self.user["sync_claim"] = None
+
+
+class _EmailRepo:
+    def __init__(self):
+        self.logs = []
+
+    async def get_email_log_by_message_id(self, message_id):
+        return next((log for log in self.logs if log["message_id"] == message_id), None)
+
+    async def insert_email_logs(self, logs):
+        self.logs.extend(logs)
+
+    async def get_thread_logs(self, thread_id, limit=10, latest=False):
+        logs = [log for log in self.logs if log["thread_id"] == thread_id]
+        return logs[-limit:] if latest else logs[:limit]
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    for name in ("vector_index_enabled", "summary_cache_enabled", "ai_routing_enabled", "thread_digest_enabled"):
+        monkeypatch.setattr(settings, name, False)
+    monkeypatch.setenv("LOCAL_AI_LATENCY_MEDIAN_MS", "1")
+    AIFactory.reload("local")
+    return EmailProcessor(_UserRepo(), _EmailRepo())
+
+
+def _run(processor, statuses):
+    gmail = _gmail(statuses)
+
+    async def get_gmail_client(user):
+        return gmail
+
+    async def sync(gmail_client, start_history_id, end_history_id):
+        return [{"id": i, "threadId": f"thread-{i}"} for i in statuses], end_history_id
+
+    processor._get_gmail_client = get_gmail_client
+    processor.sync_engine.sync = sync
+    asyncio.run(processor.process_event(EMAIL, "200"))
+
+
+def test_deleted_message_is_skipped_and_cursor_advances(processor):
+    _run(processor, {"kept": 200, "deleted": 404})
+
+    assert [log["message_id"] for log in processor.email_repo.logs] == ["kept"]
+    assert processor.user_repo.user["last_history_id"] == "200"
+    assert processor.user_repo.user["sync_claim"] is None
+
+
+@pytest.mark.parametrize("status", [429, 503, 401])
+def test_transient_fetch_failure_fails_the_event(processor, status):
+    with pytest.raises(GmailApiError):
+        _run(processor, {"kept": 200, "flaky": status})
+
+    assert processor.email_repo.logs == []
+    assert processor.user_repo.user["last_history_id"] == "100"
+    assert processor.user_repo.user["sync_claim"] is None
+
+
+def test_batch_fetch_leaves_out_deleted_messages():
+    messages = asyncio.run(GmailBatchFetcher().get_messages(_gmail({"a": 200, "b": 404}), ["a", "b"]))
+    assert list(messages) == ["a"]
+
+    single = asyncio.run(GmailBatchFetcher().get_messages(_gmail({"b": 404}), ["b"]))
+    assert single == {}
+
+
+def test_parse_emails_skips_deleted_messages():
+    parsed = asyncio.run(EmailParser().parse_emails(_gmail({"a": 404, "b": 200}), ["a", "b"]))
+    assert [email["message_id"] for email in parsed] == ["b"]
+
+
+def test_revoked_refresh_token_deactivates_user_without_failing(processor):
+    async def get_gmail_client(user):
+        raise TokenRefreshError("Token refresh failed: 400 invalid_grant", permanent=True)
+
+    async def create_or_update_user(user_data):
+        processor.user_repo.user.update(user_data)
+
+    processor._get_gmail_client = get_gmail_client
+    processor.user_repo.create_or_update_user = create_or_update_user
+    asyncio.run(processor.process_event(EMAIL, "200"))
+
+    assert processor.user_repo.user["is_active"] is False
+    assert processor.user_repo.user["last_history_id"] == "100"
+    assert processor.user_repo.user["sync_claim"] is None
+
+
+def test_transient_refresh_failure_fails_the_event(processor):
+    async def get_gmail_client(user):
+        raise TokenRefreshError("Token refresh failed: 503", permanent=False)
+
+    processor._get_gmail_client = get_gmail_client
+    with pytest.raises(TokenRefreshError):
+        asyncio.run(processor.process_event(EMAIL, "200"))
+    assert processor.user_repo.user["is_active"] is True
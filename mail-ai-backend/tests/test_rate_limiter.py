@@ -0,0 +1,40 @@
+"""
+Admission control: limiters work from whichever loop uses them, and
+tokens/min admission counts prompts the way the prompt budgeter does.
+
+Run from mail-ai-backend/:
+    python -m pytest tests
+"""
+
+import asyncio
+from common.ai_factory import OUTPUT_TOKEN_ALLOWANCE, LocalAIService
+from common.prompt_budget import PromptBudgeter
+from common.rate_limiter import RateLimiter
+
+
+def test_limiter_is_usable_from_more_than_one_loop():
+    limiter = RateLimiter(600, 0)  # Built outside any running loop, like the shared limiters
+
+    async def burst():
+        await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+
+    asyncio.run(burst())
+    asyncio.run(burst())
+    assert limiter.admitted == 6
+
+
+def test_admission_counts_tokens_like_the_budgeter():
+    acquired = []
+
+    class _Limiter:
+        async def acquire(self, tokens=0):
+            acquired.append(tokens)
+
+    service = LocalAIService()
+    service.limiter = _Limiter()
+    prompt, system = "Summarize this email about the launch. " * 20, "Be brief."
+    asyncio.run(service.admit(prompt, system))
+
+    counter = PromptBudgeter()
+    expected = counter.count_tokens(prompt, service.model_name) + counter.count_tokens(system, service.model_name)
+    assert acquired == [expected + OUTPUT_TOKEN_ALLOWANCE]
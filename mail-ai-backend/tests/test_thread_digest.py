@@ -0,0 +1,66 @@
+"""
+Thread digests leave out failed summaries, bootstrap from a thread's newest
+logs, and a digest or index failure after the log is stored does not fail
+the event.
+
+Run from mail-ai-backend/:
+    python -m pytest tests
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from services.event_processor.context_engine import ContextEngine
+from services.event_processor.thread_digest import ThreadDigester
+
+EMAIL = "user@example.com"
+START = datetime(2024, 1, 1)
+
+
+def _log(i, summary=None):
+    return {"message_id": f"m{i}", "thread_id": "t", "timestamp": START + timedelta(minutes=i),
+            "sender": "bob@example.com", "subject": "Plan", "summary": summary or f"Summary number {i}."}
+
+
+class _EmailRepo:
+    def __init__(self, logs):
+        self.logs = logs
+
+    async def get_thread_logs(self, thread_id, limit=10, latest=False):
+        return self.logs[-limit:] if latest else self.logs[:limit]
+
+
+class _DigestRepo:
+    def __init__(self, fail=False):
+        self.digests, self.fail = {}, fail
+
+    async def get_digest(self, user_email, thread_id):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        return self.digests.get(thread_id)
+
+    async def save_digest(self, digest):
+        self.digests[digest["thread_id"]] = digest
+        return True
+
+
+def test_error_summaries_are_not_added():
+    digester = ThreadDigester()
+    digest = digester.build(EMAIL, "t", [_log(1), _log(2, "[AI ERROR]: 503 Service unavailable")])
+
+    assert [e["message_id"] for e in digest["recent"]] == ["m1"]
+    assert digest["message_count"] == 1
+
+
+def test_digest_bootstrap_uses_the_newest_logs():
+    logs = [_log(i) for i in range(150)]
+    digests = _DigestRepo()
+    engine = ContextEngine(_EmailRepo(logs), digests)
+
+    asyncio.run(engine.record(EMAIL, logs[-1]))
+
+    assert [e["message_id"] for e in digests.digests["t"]["recent"]] == ["m147", "m148", "m149"]
+
+
+def test_digest_failure_does_not_fail_the_event():
+    engine = ContextEngine(_EmailRepo([_log(1)]), _DigestRepo(fail=True))
+    asyncio.run(engine.record(EMAIL, _log(1)))